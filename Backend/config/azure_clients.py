@@ -1,17 +1,39 @@
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
 from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from azure.storage.blob import BlobServiceClient
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
 from config.settings import (
     AZURE_STORAGE_CONNECTION_STRING,
+    AZURE_SEARCH_ENDPOINT,
+    AZURE_SEARCH_KEY,
     COSMOS_CONNECTION_STRING,
     COSMOS_DATABASE,
     COSMOS_CONTAINER,
+    COSMOS_UPLOADS_CONTAINER,
+    SEARCH_HTTP_CONNECT_TIMEOUT_SECONDS,
+    SEARCH_HTTP_POOL_SIZE,
+    SEARCH_HTTP_READ_TIMEOUT_SECONDS,
 )
 
 
 class AzureClients:
+    # (connect, read) timeout passed on every Azure AI Search call
+    SEARCH_TIMEOUT = (SEARCH_HTTP_CONNECT_TIMEOUT_SECONDS, SEARCH_HTTP_READ_TIMEOUT_SECONDS)
+
     _blob_service_client = None
     _mongo_client = None
     _cosmos_collection = None
+    _search_session = None
+
+    # Async clients used by the upload path so it never blocks the event loop
+    _async_blob_service_client = None
+    _async_mongo_client = None
+    _async_cosmos_collection = None
+    _async_uploads_collection = None
+    _search_http_client = None
 
     @classmethod
     def get_blob_service_client(cls) -> BlobServiceClient:
@@ -28,3 +50,87 @@ class AzureClients:
             database = cls._mongo_client[COSMOS_DATABASE]
             cls._cosmos_collection = database[COSMOS_CONTAINER]
         return cls._cosmos_collection
+
+    @classmethod
+    def get_search_session(cls) -> requests.Session:
+        """Shared keep-alive HTTP session for synchronous Azure AI Search REST calls"""
+        if cls._search_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=SEARCH_HTTP_POOL_SIZE,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Content-Type": "application/json",
+                "api-key": AZURE_SEARCH_KEY or "",
+            })
+            cls._search_session = session
+        return cls._search_session
+
+    @classmethod
+    def get_async_blob_service_client(cls) -> AsyncBlobServiceClient:
+        if cls._async_blob_service_client is None:
+            cls._async_blob_service_client = AsyncBlobServiceClient.from_connection_string(
+                AZURE_STORAGE_CONNECTION_STRING
+            )
+        return cls._async_blob_service_client
+
+    @classmethod
+    def get_async_cosmos_database(cls):
+        if cls._async_mongo_client is None:
+            cls._async_mongo_client = AsyncIOMotorClient(COSMOS_CONNECTION_STRING)
+        return cls._async_mongo_client[COSMOS_DATABASE]
+
+    @classmethod
+    def get_async_cosmos_container(cls):
+        if cls._async_cosmos_collection is None:
+            cls._async_cosmos_collection = cls.get_async_cosmos_database()[COSMOS_CONTAINER]
+        return cls._async_cosmos_collection
+
+    @classmethod
+    def get_async_uploads_container(cls):
+        """Collection tracking resumable upload sessions"""
+        if cls._async_uploads_collection is None:
+            cls._async_uploads_collection = cls.get_async_cosmos_database()[COSMOS_UPLOADS_CONTAINER]
+        return cls._async_uploads_collection
+
+    @classmethod
+    def get_search_http_client(cls) -> httpx.AsyncClient:
+        """Shared async HTTP client for Azure AI Search REST calls"""
+        if cls._search_http_client is None:
+            cls._search_http_client = httpx.AsyncClient(
+                base_url=(AZURE_SEARCH_ENDPOINT or "").rstrip("/"),
+                headers={
+                    "Content-Type": "application/json",
+                    "api-key": AZURE_SEARCH_KEY or "",
+                },
+                timeout=httpx.Timeout(
+                    SEARCH_HTTP_READ_TIMEOUT_SECONDS,
+                    connect=SEARCH_HTTP_CONNECT_TIMEOUT_SECONDS,
+                ),
+                limits=httpx.Limits(
+                    max_connections=SEARCH_HTTP_POOL_SIZE,
+                    max_keepalive_connections=SEARCH_HTTP_POOL_SIZE,
+                ),
+            )
+        return cls._search_http_client
+
+    @classmethod
+    async def close_async_clients(cls):
+        """Close async clients and the search session (called on application shutdown)"""
+        if cls._search_session is not None:
+            cls._search_session.close()
+            cls._search_session = None
+        if cls._async_blob_service_client is not None:
+            await cls._async_blob_service_client.close()
+            cls._async_blob_service_client = None
+        if cls._async_mongo_client is not None:
+            cls._async_mongo_client.close()
+            cls._async_mongo_client = None
+            cls._async_cosmos_collection = None
+            cls._async_uploads_collection = None
+        if cls._search_http_client is not None:
+            await cls._search_http_client.aclose()
+            cls._search_http_client = None
@@ -11,12 +11,43 @@ BLOB_CONTAINER_NAME = os.getenv("BLOB_CONTAINER_NAME", "documents")
 COSMOS_CONNECTION_STRING = os.getenv("COSMOS_CONNECTION_STRING")
 COSMOS_DATABASE = os.getenv("COSMOS_DATABASE", "NextBharat")
 COSMOS_CONTAINER = os.getenv("COSMOS_CONTAINER", "Documents")
+COSMOS_UPLOADS_CONTAINER = os.getenv("COSMOS_UPLOADS_CONTAINER", "UploadSessions")
 
 # Azure AI Search
 AZURE_SEARCH_ENDPOINT = os.getenv("AZURE_SEARCH_ENDPOINT")
 AZURE_SEARCH_KEY = os.getenv("AZURE_SEARCH_KEY")
 AZURE_SEARCH_INDEXER_NAME = os.getenv("AZURE_SEARCH_INDEXER_NAME", "documents-indexer")
 AZURE_SEARCH_INDEX_NAME = os.getenv("AZURE_SEARCH_INDEX_NAME", "documents-index")
+AZURE_SEARCH_KEY_FIELD = os.getenv("AZURE_SEARCH_KEY_FIELD", "metadata_storage_path")
+# Passage index: one entry per fixed-size passage with its own vector and the
+# parent document_id. When set, Q&A retrieves passages from it instead of
+# whole documents from AZURE_SEARCH_INDEX_NAME.
+AZURE_SEARCH_PASSAGE_INDEX_NAME = os.getenv("AZURE_SEARCH_PASSAGE_INDEX_NAME", "")
+
+# Azure AI Search HTTP clients: kept-alive connections per client, and
+# per-call connect/read timeouts
+SEARCH_HTTP_POOL_SIZE = int(os.getenv("SEARCH_HTTP_POOL_SIZE", "20"))
+SEARCH_HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("SEARCH_HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+SEARCH_HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("SEARCH_HTTP_READ_TIMEOUT_SECONDS", "30"))
+
+# Indexer scheduling: uploads within the debounce window share one indexer run;
+# while a run is in progress the scheduler re-checks every poll interval
+INDEXER_DEBOUNCE_SECONDS = float(os.getenv("INDEXER_DEBOUNCE_SECONDS", "5"))
+INDEXER_POLL_INTERVAL_SECONDS = float(os.getenv("INDEXER_POLL_INTERVAL_SECONDS", "15"))
+INDEXER_TRIGGER_MAX_ATTEMPTS = int(os.getenv("INDEXER_TRIGGER_MAX_ATTEMPTS", "3"))
+
+# Status reconciliation: how often pending documents are checked against the
+# index, and how many are checked per pass
+STATUS_RECONCILE_INTERVAL_SECONDS = float(os.getenv("STATUS_RECONCILE_INTERVAL_SECONDS", "10"))
+STATUS_RECONCILE_BATCH_SIZE = int(os.getenv("STATUS_RECONCILE_BATCH_SIZE", "500"))
+# Documents failed by the indexer keep being checked against the index for
+# this long, so a later successful run still completes them
+STATUS_FAILED_RECHECK_HOURS = float(os.getenv("STATUS_FAILED_RECHECK_HOURS", "24"))
+
+# Status streaming: how often a watched session's statuses are re-read, and
+# how often an idle event stream sends a keep-alive comment
+STATUS_STREAM_INTERVAL_SECONDS = float(os.getenv("STATUS_STREAM_INTERVAL_SECONDS", "5"))
+STATUS_STREAM_KEEPALIVE_SECONDS = float(os.getenv("STATUS_STREAM_KEEPALIVE_SECONDS", "15"))
 
 # Azure OpenAI
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
@@ -31,3 +62,86 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # File upload constraints
 ALLOWED_EXTENSIONS = {".pdf", ".jpg", ".jpeg", ".png", ".docx"}
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+
+# Document metadata cache: completed documents never change again and are
+# kept much longer than pending or failed ones
+DOCUMENT_CACHE_MAX_ENTRIES = int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "10000"))
+DOCUMENT_CACHE_TTL_SECONDS = float(os.getenv("DOCUMENT_CACHE_TTL_SECONDS", "5"))
+DOCUMENT_CACHE_TERMINAL_TTL_SECONDS = float(os.getenv("DOCUMENT_CACHE_TERMINAL_TTL_SECONDS", "3600"))
+
+# Session scopes: the indexed document IDs a session's questions are
+# restricted to, cached per session. Uploads handled by another worker only
+# show up once the entry expires, so the TTL stays as short as for pending
+# documents.
+SESSION_SCOPE_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_SCOPE_CACHE_MAX_ENTRIES", "10000"))
+SESSION_SCOPE_CACHE_TTL_SECONDS = float(os.getenv("SESSION_SCOPE_CACHE_TTL_SECONDS", "5"))
+
+# Search result cache: retrieval results per (query, scope, search mode),
+# dropped whenever newly indexed documents bump the index version
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+
+# Answer generation: tokens of retrieved text packed into one prompt, and
+# the most any single chunk may contribute
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_CHUNK_MAX_TOKENS = int(os.getenv("CONTEXT_CHUNK_MAX_TOKENS", "800"))
+
+# Embedding deployment resolution: the working deployment is probed once
+# (configured name first, then the fallbacks) and re-validated periodically
+EMBEDDING_DEPLOYMENT_FALLBACKS = [
+    name.strip()
+    for name in os.getenv(
+        "EMBEDDING_DEPLOYMENT_FALLBACKS", "text-embedding-3-small,text-embedding-ada-002,embedding"
+    ).split(",")
+    if name.strip()
+]
+EMBEDDING_DEPLOYMENT_REVALIDATE_SECONDS = float(os.getenv("EMBEDDING_DEPLOYMENT_REVALIDATE_SECONDS", "600"))
+
+# Query embedding micro-batching: concurrent single-query requests collected
+# for up to EMBEDDING_BATCH_WAIT_MS (or EMBEDDING_BATCH_MAX_SIZE queries) are
+# sent as one request, with at most EMBEDDING_MAX_IN_FLIGHT requests open
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "16"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "10"))
+EMBEDDING_MAX_IN_FLIGHT = int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4"))
+
+# Bulk embeddings (generate_batch_embeddings): inputs are split into requests
+# of at most EMBEDDING_REQUEST_MAX_ITEMS texts / EMBEDDING_REQUEST_MAX_TOKENS
+# tokens (each text cut to EMBEDDING_INPUT_MAX_TOKENS), sent
+# EMBEDDING_BULK_CONCURRENCY at a time and at most
+# EMBEDDING_BULK_REQUESTS_PER_MINUTE per minute (0 = unlimited)
+EMBEDDING_INPUT_MAX_TOKENS = int(os.getenv("EMBEDDING_INPUT_MAX_TOKENS", "8191"))
+EMBEDDING_REQUEST_MAX_ITEMS = int(os.getenv("EMBEDDING_REQUEST_MAX_ITEMS", "256"))
+EMBEDDING_REQUEST_MAX_TOKENS = int(os.getenv("EMBEDDING_REQUEST_MAX_TOKENS", "100000"))
+EMBEDDING_BULK_CONCURRENCY = int(os.getenv("EMBEDDING_BULK_CONCURRENCY", "4"))
+EMBEDDING_BULK_REQUESTS_PER_MINUTE = int(os.getenv("EMBEDDING_BULK_REQUESTS_PER_MINUTE", "0"))
+EMBEDDING_BULK_MAX_RETRIES = int(os.getenv("EMBEDDING_BULK_MAX_RETRIES", "5"))
+
+# Embedding cache: float32 vectors in memory (LRU), backed by a memory-mapped
+# file shared by all workers (EMBEDDING_CACHE_DIR empty disables the disk tier)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "5000"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+EMBEDDING_CACHE_DISK_SLOTS = int(os.getenv("EMBEDDING_CACHE_DISK_SLOTS", "20000"))
+
+# Document listing: default and maximum page size for GET /documents
+DOCUMENTS_PAGE_SIZE = int(os.getenv("DOCUMENTS_PAGE_SIZE", "50"))
+DOCUMENTS_MAX_PAGE_SIZE = int(os.getenv("DOCUMENTS_MAX_PAGE_SIZE", "200"))
+
+# Streaming uploads: files are staged to Blob Storage as blocks of this size,
+# with at most UPLOAD_MAX_CONCURRENCY blocks in flight per upload
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 4 * 1024 * 1024))  # 4MB
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", "4"))
+
+# Batch uploads: files per request and files transferred in parallel
+UPLOAD_BATCH_MAX_FILES = int(os.getenv("UPLOAD_BATCH_MAX_FILES", "50"))
+UPLOAD_BATCH_CONCURRENCY = int(os.getenv("UPLOAD_BATCH_CONCURRENCY", "4"))
+
+# Resumable uploads: largest chunk accepted by a single PUT
+RESUMABLE_CHUNK_MAX_SIZE = int(os.getenv("RESUMABLE_CHUNK_MAX_SIZE", 16 * 1024 * 1024))  # 16MB
+
+# Local text extraction: documents are parsed and chunked in a process pool
+# right after upload and pushed into the search index as passages
+LOCAL_EXTRACTION_ENABLED = os.getenv("LOCAL_EXTRACTION_ENABLED", "true").lower() == "true"
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+PASSAGE_SIZE = int(os.getenv("PASSAGE_SIZE", "2000"))  # characters
+PASSAGE_OVERLAP = int(os.getenv("PASSAGE_OVERLAP", "200"))  # characters
@@ -1,6 +1,16 @@
-from fastapi import File, HTTPException, UploadFile
+import asyncio
+import json
+from typing import AsyncIterator, List
+from fastapi import File, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from config.settings import DOCUMENTS_PAGE_SIZE, STATUS_STREAM_KEEPALIVE_SECONDS
+from services.status_hub import StatusHub
 from services.document_service import DocumentService
-from models.document import DocumentUploadResponse, DocumentListResponse
+from models.document import (
+    DocumentBatchUploadResponse,
+    DocumentListResponse,
+    DocumentUploadResponse,
+)
 
 
 class DocumentController:
@@ -15,6 +25,16 @@ class DocumentController:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+    @staticmethod
+    async def upload_documents(files: List[UploadFile], session_id: str) -> DocumentBatchUploadResponse:
+        """Controller for batch document upload"""
+        try:
+            return await DocumentService.upload_documents(files, session_id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Batch upload failed: {str(e)}")
+
     @staticmethod
     def get_document(document_id: str) -> dict:
         """Controller for getting document metadata"""
@@ -28,11 +48,48 @@ class DocumentController:
             )
 
     @staticmethod
-    def list_documents(session_id: str = None) -> DocumentListResponse:
+    def check_document_status(document_id: str) -> dict:
+        """Controller for checking document indexing status"""
+        try:
+            return DocumentService.check_document_status(document_id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @staticmethod
+    def list_documents(
+        session_id: str = None, limit: int = DOCUMENTS_PAGE_SIZE, cursor: str = None
+    ) -> DocumentListResponse:
         """Controller for listing documents (optionally filtered by session)"""
         try:
-            return DocumentService.list_documents(session_id)
+            return DocumentService.list_documents(session_id, limit, cursor)
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(
                 status_code=500, detail=f"Failed to fetch documents: {str(e)}"
             )
+
+    @staticmethod
+    def stream_document_statuses(session_id: str, request: Request) -> StreamingResponse:
+        """Controller for the server-sent events stream of a session's document statuses"""
+        return StreamingResponse(
+            DocumentController._status_events(session_id, request),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @staticmethod
+    async def _status_events(session_id: str, request: Request) -> AsyncIterator[str]:
+        queue = StatusHub.subscribe(session_id)
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), STATUS_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
+        finally:
+            StatusHub.unsubscribe(session_id, queue)
@@ -1,6 +1,8 @@
+import json
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
 from services.qa_service import QAService
-from typing import Optional
+from typing import Iterator, Optional
 
 
 class QAController:
@@ -22,3 +24,21 @@ class QAController:
             raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to process question: {str(e)}")
+
+    @staticmethod
+    def stream_answer(question: str, document_id: Optional[str] = None, session_id: Optional[str] = None) -> StreamingResponse:
+        """Controller for the server-sent events stream of an answer"""
+        if not question or len(question.strip()) == 0:
+            raise HTTPException(status_code=400, detail="Question cannot be empty")
+
+        return StreamingResponse(
+            QAController._answer_events(question, document_id, session_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @staticmethod
+    def _answer_events(question: str, document_id: Optional[str], session_id: Optional[str]) -> Iterator[str]:
+        # Sync generator: Starlette iterates it in the threadpool
+        for event in QAService.stream_answer(question, document_id, session_id):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -0,0 +1,66 @@
+from fastapi import HTTPException, Request
+from config.settings import RESUMABLE_CHUNK_MAX_SIZE
+from services.upload_session_service import UploadSessionService
+
+
+class UploadController:
+    @staticmethod
+    async def create_upload_session(filename: str, size: int, session_id: str) -> dict:
+        """Controller for opening a resumable upload session"""
+        try:
+            return await UploadSessionService.create_session(filename, size, session_id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to create upload session: {str(e)}")
+
+    @staticmethod
+    async def get_upload_session(upload_id: str, session_id: str) -> dict:
+        """Controller for querying the current offset of an upload session"""
+        try:
+            upload_session = await UploadSessionService.get_session(upload_id, session_id)
+            return UploadSessionService.session_status(upload_session)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to fetch upload session: {str(e)}")
+
+    @staticmethod
+    async def upload_chunk(upload_id: str, offset: int, request: Request, session_id: str) -> dict:
+        """Controller for uploading one chunk of a resumable upload"""
+        try:
+            data = await UploadController._read_chunk(request)
+            return await UploadSessionService.upload_chunk(upload_id, session_id, offset, data)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Chunk upload failed: {str(e)}")
+
+    @staticmethod
+    async def complete_upload(upload_id: str, session_id: str) -> dict:
+        """Controller for finalizing a resumable upload"""
+        try:
+            return await UploadSessionService.complete_session(upload_id, session_id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+    @staticmethod
+    async def _read_chunk(request: Request) -> bytes:
+        """Read the raw request body, refusing chunks above the size limit"""
+        too_large = HTTPException(
+            status_code=413,
+            detail=f"Chunk exceeds maximum size of {RESUMABLE_CHUNK_MAX_SIZE} bytes",
+        )
+
+        content_length = request.headers.get("content-length")
+        if content_length and int(content_length) > RESUMABLE_CHUNK_MAX_SIZE:
+            raise too_large
+
+        data = bytearray()
+        async for part in request.stream():
+            data.extend(part)
+            if len(data) > RESUMABLE_CHUNK_MAX_SIZE:
+                raise too_large
+        return bytes(data)
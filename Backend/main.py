@@ -1,9 +1,40 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from config.azure_clients import AzureClients
+from services.cosmos_service import CosmosDBService
+from services.embedding_service import EmbeddingDeployment
+from services.extraction_service import ExtractionService
+from services.indexer_scheduler import IndexerScheduler
+from services.status_hub import StatusHub
+from services.status_reconciler import StatusReconciler
 from routes.document_routes import router as document_router
 from routes.qa_routes import router as qa_router
-
-app = FastAPI(title="Document Q&A API", version="1.0.0")
+from routes.upload_routes import router as upload_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await CosmosDBService.ensure_indexes_async()
+    except Exception as e:
+        print(f"Failed to create Cosmos DB indexes: {e}")
+    IndexerScheduler.start()
+    ExtractionService.start()
+    StatusReconciler.start()
+    EmbeddingDeployment.start()
+    yield
+    await EmbeddingDeployment.stop()
+    await StatusHub.stop()
+    await StatusReconciler.stop()
+    await ExtractionService.stop()
+    await IndexerScheduler.stop()
+    # Release pooled async connections (Blob, Mongo, AI Search)
+    await AzureClients.close_async_clients()
+
+
+app = FastAPI(title="Document Q&A API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,6 +47,7 @@ app.add_middleware(
 # Include routers
 app.include_router(document_router)
 app.include_router(qa_router)
+app.include_router(upload_router)
 
 
 @app.get("/")
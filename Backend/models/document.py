@@ -26,6 +26,19 @@ class DocumentUploadResponse(BaseModel):
     status: str
 
 
+class DocumentBatchUploadResponse(BaseModel):
+    results: list
+    uploaded: int
+    failed: int
+    indexer_scheduled: bool
+
+
 class DocumentListResponse(BaseModel):
     documents: list
     count: int
+    next_cursor: Optional[str] = None
+
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    size: int
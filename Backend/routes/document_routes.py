@@ -1,9 +1,10 @@
-from datetime import datetime
+from typing import List
 
+from config.settings import DOCUMENTS_MAX_PAGE_SIZE, DOCUMENTS_PAGE_SIZE
 from controllers.document_controller import DocumentController
-from fastapi import APIRouter, File, Header, HTTPException, Query, UploadFile
+from fastapi import APIRouter, File, Header, Query, Request, UploadFile
 from services.ai_search_service import AISearchService
-from services.cosmos_service import CosmosDBService
+from utils.cache import cache_stats
 
 router = APIRouter(prefix="/api/v1", tags=["documents"])
 
@@ -17,12 +18,32 @@ async def upload_document(
     return await DocumentController.upload_document(file, x_session_id)
 
 
+@router.post("/upload/batch")
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    x_session_id: str = Header(..., description="User session ID"),
+):
+    """Upload several documents at once; the indexer is triggered once for the whole batch"""
+    return await DocumentController.upload_documents(files, x_session_id)
+
+
 @router.get("/documents")
 def list_documents(
     session_id: str = Query(None, description="Filter documents by session ID"),
+    limit: int = Query(DOCUMENTS_PAGE_SIZE, ge=1, le=DOCUMENTS_MAX_PAGE_SIZE, description="Page size"),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
 ):
-    """List uploaded documents (Filtered by session_id)"""
-    return DocumentController.list_documents(session_id)
+    """List uploaded documents, newest first (Filtered by session_id, paginated with next_cursor)"""
+    return DocumentController.list_documents(session_id, limit, cursor)
+
+
+@router.get("/documents/events")
+async def stream_document_statuses(
+    request: Request,
+    session_id: str = Query(..., description="Session whose documents to watch"),
+):
+    """Server-sent events stream of document status changes for a session (replaces polling)"""
+    return DocumentController.stream_document_statuses(session_id, request)
 
 
 @router.get("/documents/{document_id}")
@@ -33,53 +54,8 @@ def get_document(document_id: str):
 
 @router.get("/documents/{document_id}/status")
 def check_document_status(document_id: str):
-    """Check document indexing status. Frontend polls this endpoint after upload."""
-
-    try:
-        document = CosmosDBService.get_document(document_id)
-
-        # If document does not exist
-        if not document:
-            raise HTTPException(status_code=404, detail="Document not found")
-
-        status = document.get("status", "unknown")
-
-        # If already completed, nothing else to do
-        if status == "completed":
-            return {
-                "document_id": document_id,
-                "status": "completed",
-                "message": "Document is indexed and ready",
-            }
-
-        # If not indexed yet, return processing state
-        if not AISearchService.check_document_indexed(document_id):
-            return {
-                "document_id": document_id,
-                "status": status,
-                "message": "Document is being indexed...",
-            }
-
-        # document is indexed, updating status to completed
-        CosmosDBService.update_document(
-            document_id,
-            {
-                "status": "completed",
-                "processed": True,
-                "completed_at": datetime.utcnow().isoformat(),
-            },
-        )
-
-        return {
-            "document_id": document_id,
-            "status": "completed",
-            "message": "Document indexed successfully",
-        }
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    """Check document indexing status (a single read; prefer /documents/events over polling)"""
+    return DocumentController.check_document_status(document_id)
 
 
 @router.post("/indexer/trigger")
@@ -94,3 +70,9 @@ def get_indexer_status():
     """Get the status of AI Search indexer"""
     result = AISearchService.get_indexer_status()
     return result
+
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Hit, miss and eviction counters of the in-process caches"""
+    return cache_stats()
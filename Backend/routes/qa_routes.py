@@ -13,18 +13,22 @@ class QuestionRequest(BaseModel):
 
 
 @router.post("/ask")
-def ask_question(request: QuestionRequest):
+def ask_question(
+    request: QuestionRequest,
+    x_session_id: Optional[str] = Header(None, description="User session ID"),
+):
     """
     Ask a question about uploaded documents
     
     - **question**: The question to ask
     - **document_id**: Optional - Filter answers to specific document
-    - **session_id**: Optional - Session tracking
+    - **session_id**: Optional - Only search this session's documents
+      (defaults to the X-Session-Id header)
     """
     return QAController.ask_question(
         question=request.question,
         document_id=request.document_id,
-        session_id=request.session_id
+        session_id=request.session_id or x_session_id
     )
 
 
@@ -32,7 +36,7 @@ def ask_question(request: QuestionRequest):
 def ask_question_get(
     question: str = Query(..., description="Question to ask"),
     document_id: str = Query(None, description="Optional document ID filter"),
-    session_id: str = Query(None, description="Optional session ID")
+    session_id: str = Query(None, description="Optional session ID (only search its documents)")
 ):
     """Ask a question via GET request (for simple queries)"""
     return QAController.ask_question(
@@ -40,3 +44,36 @@ def ask_question_get(
         document_id=document_id,
         session_id=session_id
     )
+
+
+@router.post("/ask/stream")
+def ask_question_stream(
+    request: QuestionRequest,
+    x_session_id: Optional[str] = Header(None, description="User session ID"),
+):
+    """
+    Ask a question and stream the answer as server-sent events
+
+    Emits `retrieval` and `citations` first, then `token` events as the
+    answer is generated, and finally `done` with token usage and timings
+    (or `error`).
+    """
+    return QAController.stream_answer(
+        question=request.question,
+        document_id=request.document_id,
+        session_id=request.session_id or x_session_id
+    )
+
+
+@router.get("/ask/stream")
+def ask_question_stream_get(
+    question: str = Query(..., description="Question to ask"),
+    document_id: str = Query(None, description="Optional document ID filter"),
+    session_id: str = Query(None, description="Optional session ID (only search its documents)")
+):
+    """Stream an answer via GET (for EventSource clients)"""
+    return QAController.stream_answer(
+        question=question,
+        document_id=document_id,
+        session_id=session_id
+    )
@@ -0,0 +1,45 @@
+from controllers.upload_controller import UploadController
+from fastapi import APIRouter, Header, Query, Request
+from models.document import UploadSessionRequest
+
+router = APIRouter(prefix="/api/v1", tags=["uploads"])
+
+
+@router.post("/uploads")
+async def create_upload_session(
+    request: UploadSessionRequest,
+    x_session_id: str = Header(..., description="User session ID"),
+):
+    """Open a resumable upload session for a file of known size"""
+    return await UploadController.create_upload_session(
+        request.filename, request.size, x_session_id
+    )
+
+
+@router.get("/uploads/{upload_id}")
+async def get_upload_session(
+    upload_id: str,
+    x_session_id: str = Header(..., description="User session ID"),
+):
+    """Get the current offset of an upload session (to resume after a failure)"""
+    return await UploadController.get_upload_session(upload_id, x_session_id)
+
+
+@router.put("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Byte offset of this chunk"),
+    x_session_id: str = Header(..., description="User session ID"),
+):
+    """Upload the next chunk (raw request body) starting at `offset`"""
+    return await UploadController.upload_chunk(upload_id, offset, request, x_session_id)
+
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    x_session_id: str = Header(..., description="User session ID"),
+):
+    """Finalize a resumable upload once all bytes were received"""
+    return await UploadController.complete_upload(upload_id, x_session_id)
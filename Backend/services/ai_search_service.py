@@ -1,73 +1,69 @@
 import os
-import requests
-import base64
-from typing import Optional
+from typing import List, Optional, Set
+from config.azure_clients import AzureClients
 from config.settings import (
     AZURE_SEARCH_ENDPOINT,
     AZURE_SEARCH_KEY,
     AZURE_SEARCH_INDEXER_NAME,
-    AZURE_SEARCH_INDEX_NAME
+    AZURE_SEARCH_INDEX_NAME,
 )
+from utils import odata
 
 
 class AISearchService:
+    # Incremented whenever documents become searchable; results cached
+    # under an older version are never served
+    _index_version = 0
+
+    @staticmethod
+    def index_version() -> int:
+        """Current index version stamp"""
+        return AISearchService._index_version
+
     @staticmethod
-    def check_document_indexed(document_id: str) -> bool:
+    def bump_index_version() -> None:
+        """Mark the index as changed (new documents were indexed or completed)"""
+        AISearchService._index_version += 1
+
+    @staticmethod
+    async def get_indexed_document_ids_async(document_ids: List[str]) -> Set[str]:
         """
-        Check if a document has been indexed in AI Search
+        Check which of the given documents are indexed, with a single query
+        
+        Filters on the `document_id` field and reads the distinct values
+        back from a facet, so the response size depends on the number of
+        documents asked about rather than on passages per document.
         
         Args:
-            document_id: Document ID to check
+            document_ids: Document IDs to check
             
         Returns:
-            True if document is indexed, False otherwise
+            Subset of document_ids present in the index
         """
-        if not all([AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY, AZURE_SEARCH_INDEX_NAME]):
-            return False
+        document_ids = list(dict.fromkeys(document_ids))
+        if not document_ids:
+            return set()
         
-        endpoint = AZURE_SEARCH_ENDPOINT.rstrip('/')
-        url = f"{endpoint}/indexes/{AZURE_SEARCH_INDEX_NAME}/docs/search?api-version=2023-11-01"
-        
-        headers = {
-            "Content-Type": "application/json",
-            "api-key": AZURE_SEARCH_KEY
-        }
+        if not all([AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY, AZURE_SEARCH_INDEX_NAME]):
+            return set()
         
-        # Get all documents and check their paths
-        # The path is base64 encoded and contains: ...documents/document_id/filename
+        client = AzureClients.get_search_http_client()
         payload = {
             "search": "*",
-            "top": 100  # Check up to 100 documents
+            "filter": odata.search_in("document_id", document_ids),
+            "facets": [f"document_id,count:{len(document_ids)}"],
+            "top": 0
         }
         
-        try:
-            response = requests.post(url, headers=headers, json=payload)
-            
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Check if any document path contains our document_id
-                for doc in result.get("value", []):
-                    encoded_path = doc.get("metadata_storage_path", "")
-                    
-                    try:
-                        # Decode base64 path
-                        # Add padding if needed
-                        encoded_path += '=' * (4 - len(encoded_path) % 4)
-                        decoded_path = base64.b64decode(encoded_path).decode('utf-8')
-                        
-                        # Check if our document_id is in the path
-                        if f"/documents/{document_id}/" in decoded_path or f"/documents/{document_id}" in decoded_path:
-                            return True
-                    except:
-                        continue
-                
-                return False
-            else:
-                return False
-                
-        except Exception:
-            return False
+        response = await client.post(
+            f"/indexes/{AZURE_SEARCH_INDEX_NAME}/docs/search?api-version=2023-11-01",
+            json=payload,
+        )
+        if response.status_code != 200:
+            raise Exception(f"Search failed: {response.status_code} - {response.text}")
+        
+        facets = response.json().get("@search.facets", {}).get("document_id", [])
+        return {facet["value"] for facet in facets if facet.get("count")}
     
     @staticmethod
     def trigger_indexer(indexer_name: Optional[str] = None) -> dict:
@@ -95,30 +91,72 @@ class AISearchService:
         # Azure AI Search REST API endpoint to run indexer
         url = f"{endpoint}/indexers/{indexer_name}/run?api-version=2023-11-01"
         
-        headers = {
-            "Content-Type": "application/json",
-            "api-key": AZURE_SEARCH_KEY
-        }
-        
         try:
-            response = requests.post(url, headers=headers)
+            response = AzureClients.get_search_session().post(
+                url, timeout=AzureClients.SEARCH_TIMEOUT
+            )
+            return AISearchService._indexer_run_result(
+                indexer_name, response.status_code, response.text
+            )
+                
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Error triggering indexer: {str(e)}"
+            }
+
+    @staticmethod
+    async def trigger_indexer_async(indexer_name: Optional[str] = None) -> dict:
+        """
+        Trigger Azure AI Search indexer using the shared async HTTP client
+        
+        Args:
+            indexer_name: Name of the indexer to run (uses default from settings if not provided)
             
-            if response.status_code == 202:
-                return {
-                    "status": "success",
-                    "message": f"Indexer '{indexer_name}' triggered successfully"
-                }
-            else:
-                return {
-                    "status": "error",
-                    "message": f"Failed to trigger indexer: {response.status_code} - {response.text}"
-                }
+        Returns:
+            dict with status and message
+        """
+        if not indexer_name:
+            indexer_name = AZURE_SEARCH_INDEXER_NAME
+            
+        if not all([AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY, indexer_name]):
+            return {
+                "status": "skipped",
+                "message": "AI Search not configured"
+            }
+        
+        client = AzureClients.get_search_http_client()
+        
+        try:
+            response = await client.post(f"/indexers/{indexer_name}/run?api-version=2023-11-01")
+            return AISearchService._indexer_run_result(
+                indexer_name, response.status_code, response.text
+            )
                 
         except Exception as e:
             return {
                 "status": "error",
                 "message": f"Error triggering indexer: {str(e)}"
             }
+
+    @staticmethod
+    def _indexer_run_result(indexer_name: str, status_code: int, text: str) -> dict:
+        """Map the indexer run response to a status dict"""
+        if status_code == 202:
+            return {
+                "status": "success",
+                "message": f"Indexer '{indexer_name}' triggered successfully"
+            }
+        if status_code == 409:
+            # Azure rejects a run while another invocation is in progress
+            return {
+                "status": "busy",
+                "message": f"Indexer '{indexer_name}' is already running"
+            }
+        return {
+            "status": "error",
+            "message": f"Failed to trigger indexer: {status_code} - {text}"
+        }
     
     @staticmethod
     def get_indexer_status(indexer_name: Optional[str] = None) -> dict:
@@ -132,13 +170,38 @@ class AISearchService:
         endpoint = AZURE_SEARCH_ENDPOINT.rstrip('/')
         url = f"{endpoint}/indexers/{indexer_name}/status?api-version=2023-11-01"
         
-        headers = {
-            "Content-Type": "application/json",
-            "api-key": AZURE_SEARCH_KEY
-        }
+        try:
+            response = AzureClients.get_search_session().get(
+                url, timeout=AzureClients.SEARCH_TIMEOUT
+            )
+            
+            if response.status_code == 200:
+                return response.json()
+            else:
+                return {
+                    "status": "error",
+                    "message": f"Failed to get indexer status: {response.status_code}"
+                }
+                
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Error getting indexer status: {str(e)}"
+            }
+
+    @staticmethod
+    async def get_indexer_status_async(indexer_name: Optional[str] = None) -> dict:
+        """Get the status of an indexer using the shared async HTTP client"""
+        if not indexer_name:
+            indexer_name = AZURE_SEARCH_INDEXER_NAME
+            
+        if not all([AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY, indexer_name]):
+            return {"status": "error", "message": "AI Search not configured"}
+        
+        client = AzureClients.get_search_http_client()
         
         try:
-            response = requests.get(url, headers=headers)
+            response = await client.get(f"/indexers/{indexer_name}/status?api-version=2023-11-01")
             
             if response.status_code == 200:
                 return response.json()
@@ -153,3 +216,46 @@ class AISearchService:
                 "status": "error",
                 "message": f"Error getting indexer status: {str(e)}"
             }
+
+    @staticmethod
+    def is_indexer_running(indexer_status: dict) -> bool:
+        """Whether an indexer status response reports a run in progress"""
+        last_result = indexer_status.get("lastResult") or {}
+        return last_result.get("status") == "inProgress"
+
+    @staticmethod
+    async def index_documents_async(
+        documents: List[dict], batch_size: int = 1000, index_name: Optional[str] = None
+    ) -> int:
+        """
+        Push documents straight into a search index (mergeOrUpload)
+
+        Args:
+            documents: Index documents, each including the index key field
+            batch_size: Documents per request (the REST API accepts up to 1000)
+            index_name: Target index (defaults to AZURE_SEARCH_INDEX_NAME)
+
+        Returns:
+            Number of documents indexed successfully
+        """
+        index_name = index_name or AZURE_SEARCH_INDEX_NAME
+        if not all([AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY, index_name]):
+            raise Exception("Azure AI Search not properly configured")
+
+        client = AzureClients.get_search_http_client()
+        url = f"/indexes/{index_name}/docs/index?api-version=2023-11-01"
+
+        indexed = 0
+        for start in range(0, len(documents), batch_size):
+            batch = [
+                {"@search.action": "mergeOrUpload", **doc}
+                for doc in documents[start:start + batch_size]
+            ]
+            response = await client.post(url, json={"value": batch})
+
+            # 207 means some documents in the batch failed
+            if response.status_code not in (200, 207):
+                raise Exception(f"Indexing failed: {response.status_code} - {response.text}")
+            indexed += sum(1 for r in response.json().get("value", []) if r.get("status"))
+
+        return indexed
@@ -1,5 +1,9 @@
+import asyncio
+import hashlib
+from typing import AsyncIterator, Dict, List, Optional
+
 from config.azure_clients import AzureClients
-from config.settings import BLOB_CONTAINER_NAME
+from config.settings import BLOB_CONTAINER_NAME, UPLOAD_MAX_CONCURRENCY
 
 
 class BlobStorageService:
@@ -13,6 +17,101 @@ class BlobStorageService:
         blob_client.upload_blob(file_content, overwrite=True)
         return blob_client.url
 
+    @staticmethod
+    async def stage_stream(
+        blob_name: str,
+        chunks: AsyncIterator[bytes],
+        max_concurrency: int = UPLOAD_MAX_CONCURRENCY,
+    ) -> List[str]:
+        """
+        Stage a file as uncommitted blob blocks without committing it
+
+        Each chunk is staged as one block while the next one is read, with at
+        most `max_concurrency` blocks in flight, so memory stays bounded by
+        chunk size x concurrency regardless of file size. Blocks that are
+        never committed are discarded by Blob Storage.
+
+        Args:
+            blob_name: Target blob name
+            chunks: Async iterator yielding the file content in chunks
+            max_concurrency: Maximum number of blocks staged concurrently
+
+        Returns:
+            Ordered list of staged block IDs
+        """
+        blob_service_client = AzureClients.get_async_blob_service_client()
+        blob_client = blob_service_client.get_blob_client(
+            container=BLOB_CONTAINER_NAME, blob=blob_name
+        )
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        block_ids: List[str] = []
+        tasks: List[asyncio.Task] = []
+
+        async def stage(block_id: str, data: bytes):
+            try:
+                await blob_client.stage_block(block_id, data)
+            finally:
+                semaphore.release()
+
+        try:
+            async for chunk in chunks:
+                # Wait for a free slot before holding on to another chunk
+                await semaphore.acquire()
+
+                # Surface staging failures early instead of reading the whole file
+                for task in tasks:
+                    if task.done() and task.exception():
+                        semaphore.release()
+                        raise task.exception()
+
+                # Block IDs must all have the same length within a blob
+                block_id = f"{len(block_ids):06d}"
+                block_ids.append(block_id)
+                tasks.append(asyncio.create_task(stage(block_id, chunk)))
+
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+        return block_ids
+
+    @staticmethod
+    def index_metadata(document_metadata: dict) -> Dict[str, str]:
+        """Blob metadata that the indexer copies into filterable index fields"""
+        return {
+            "document_id": document_metadata["document_id"],
+            "session_id": document_metadata["session_id"],
+        }
+
+    @staticmethod
+    async def stage_block(blob_name: str, block_id: str, data: bytes) -> None:
+        """Stage a single uncommitted block of a blob"""
+        blob_service_client = AzureClients.get_async_blob_service_client()
+        blob_client = blob_service_client.get_blob_client(
+            container=BLOB_CONTAINER_NAME, blob=blob_name
+        )
+        await blob_client.stage_block(block_id, data)
+
+    @staticmethod
+    async def commit_blocks(
+        blob_name: str, block_ids: List[str], metadata: Optional[Dict[str, str]] = None
+    ) -> str:
+        """
+        Commit previously staged blocks as the blob content and return blob URL
+
+        Blob metadata is picked up by the search indexer as index fields
+        of the same name.
+        """
+        blob_service_client = AzureClients.get_async_blob_service_client()
+        blob_client = blob_service_client.get_blob_client(
+            container=BLOB_CONTAINER_NAME, blob=blob_name
+        )
+        await blob_client.commit_block_list(block_ids, metadata=metadata)
+        return blob_client.url
+
     @staticmethod
     def delete_file(blob_name: str) -> bool:
         """Delete file from Azure Blob Storage"""
@@ -26,6 +125,32 @@ class BlobStorageService:
         except Exception:
             return False
 
+    @staticmethod
+    async def delete_file_async(blob_name: str) -> bool:
+        """Delete file from Azure Blob Storage without blocking the event loop"""
+        try:
+            blob_service_client = AzureClients.get_async_blob_service_client()
+            blob_client = blob_service_client.get_blob_client(
+                container=BLOB_CONTAINER_NAME, blob=blob_name
+            )
+            await blob_client.delete_blob()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    async def hash_file_async(blob_name: str) -> str:
+        """SHA-256 of a blob's content, streamed chunk by chunk"""
+        blob_service_client = AzureClients.get_async_blob_service_client()
+        blob_client = blob_service_client.get_blob_client(
+            container=BLOB_CONTAINER_NAME, blob=blob_name
+        )
+        sha256 = hashlib.sha256()
+        downloader = await blob_client.download_blob()
+        async for chunk in downloader.chunks():
+            sha256.update(chunk)
+        return sha256.hexdigest()
+
     @staticmethod
     def get_file_url(blob_name: str) -> str:
         """Get URL for a blob"""
@@ -43,3 +168,13 @@ class BlobStorageService:
             container=BLOB_CONTAINER_NAME, blob=blob_name
         )
         return blob_client.download_blob().readall()
+
+    @staticmethod
+    async def download_file_async(blob_name: str) -> bytes:
+        """Download file from Azure Blob Storage without blocking the event loop"""
+        blob_service_client = AzureClients.get_async_blob_service_client()
+        blob_client = blob_service_client.get_blob_client(
+            container=BLOB_CONTAINER_NAME, blob=blob_name
+        )
+        downloader = await blob_client.download_blob()
+        return await downloader.readall()
@@ -1,48 +1,243 @@
-from typing import List, Optional
+import logging
+from typing import Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import OperationFailure
 from config.azure_clients import AzureClients
+from config.settings import (
+    COSMOS_CONNECTION_STRING,
+    DOCUMENT_CACHE_MAX_ENTRIES,
+    DOCUMENT_CACHE_TERMINAL_TTL_SECONDS,
+    DOCUMENT_CACHE_TTL_SECONDS,
+    SESSION_SCOPE_CACHE_MAX_ENTRIES,
+    SESSION_SCOPE_CACHE_TTL_SECONDS,
+)
 from models.document import DocumentMetadata
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Fields the document list renders
+LIST_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "document_id": 1,
+    "session_id": 1,
+    "filename": 1,
+    "file_size": 1,
+    "file_type": 1,
+    "status": 1,
+    "processed": 1,
+    "upload_date": 1,
+    "error_message": 1,
+}
+
+# Fields needed to report a document's indexing status
+STATUS_PROJECTION = {
+    "_id": 0,
+    "document_id": 1,
+    "filename": 1,
+    "status": 1,
+    "processed": 1,
+    "error_message": 1,
+}
+
+# Statuses that never change again; "failed" is not one of them because the
+# reconciler still completes failed documents that a later indexer run indexed
+TERMINAL_STATUSES = ("completed",)
+
+# Read-through cache of document metadata keyed by document_id. Writes made
+# through this service refresh or drop the affected entries.
+document_cache = TTLCache("documents", DOCUMENT_CACHE_MAX_ENTRIES, DOCUMENT_CACHE_TTL_SECONDS)
+
+# Indexed document IDs per session, keyed by session_id. Creating a document
+# drops its session's entry in this worker; other workers see it once their
+# short-lived entry expires.
+session_scope_cache = TTLCache(
+    "session_scopes", SESSION_SCOPE_CACHE_MAX_ENTRIES, SESSION_SCOPE_CACHE_TTL_SECONDS
+)
+
+
+def _cache_document(document: Optional[dict]) -> None:
+    """Store a document in the cache with a TTL that depends on its status"""
+    if not document or not document.get("document_id"):
+        return
+    ttl = (
+        DOCUMENT_CACHE_TERMINAL_TTL_SECONDS
+        if document.get("status") in TERMINAL_STATUSES
+        else DOCUMENT_CACHE_TTL_SECONDS
+    )
+    document_cache.set(document["document_id"], dict(document), ttl)
 
 
 class CosmosDBService:
+    @staticmethod
+    async def ensure_indexes_async() -> None:
+        """Create the indexes the document queries rely on (idempotent, run at startup)"""
+        if not COSMOS_CONNECTION_STRING:
+            return
+        collection = AzureClients.get_async_cosmos_container()
+
+        try:
+            await collection.create_index("document_id", unique=True)
+        except OperationFailure as e:
+            # Cosmos DB only creates unique indexes on empty collections
+            logger.warning(f"Unique index on document_id not created ({e}); using a regular index")
+            await collection.create_index("document_id")
+
+        await collection.create_index(
+            [("session_id", ASCENDING), ("upload_date", DESCENDING), ("document_id", DESCENDING)]
+        )
+        await collection.create_index([("upload_date", DESCENDING), ("document_id", DESCENDING)])
+        await collection.create_index("content_hash")
+        await collection.create_index("status")
+        await collection.create_index("completed_at")
+        await collection.create_index([("status", ASCENDING), ("failed_at", DESCENDING)])
+
+        uploads = AzureClients.get_async_uploads_container()
+        await uploads.create_index("upload_id", unique=True)
+
     @staticmethod
     def create_document(document_data: dict) -> dict:
         """Create a new document record in Cosmos DB (MongoDB API)"""
         collection = AzureClients.get_cosmos_container()
         result = collection.insert_one(document_data)
         document_data['_id'] = str(result.inserted_id)
+        session_scope_cache.invalidate(document_data.get("session_id"))
+        return document_data
+
+    @staticmethod
+    async def create_document_async(document_data: dict) -> dict:
+        """Create a new document record without blocking the event loop"""
+        collection = AzureClients.get_async_cosmos_container()
+        result = await collection.insert_one(document_data)
+        document_data['_id'] = str(result.inserted_id)
+        session_scope_cache.invalidate(document_data.get("session_id"))
         return document_data
 
+    @staticmethod
+    async def create_documents_async(documents: List[dict]) -> List[dict]:
+        """Create several document records with a single insert_many"""
+        collection = AzureClients.get_async_cosmos_container()
+        result = await collection.insert_many(documents, ordered=False)
+        for document, inserted_id in zip(documents, result.inserted_ids):
+            document['_id'] = str(inserted_id)
+        session_scope_cache.invalidate(*{document.get("session_id") for document in documents})
+        return documents
+
     @staticmethod
     def get_document(document_id: str) -> Optional[dict]:
-        """Get document by ID"""
+        """Get document by ID (served from the metadata cache when possible)"""
+        cached = document_cache.get(document_id)
+        if cached is not None:
+            return dict(cached)
         try:
             collection = AzureClients.get_cosmos_container()
             document = collection.find_one({"document_id": document_id})
             if document and '_id' in document:
                 document['_id'] = str(document['_id'])
+            _cache_document(document)
             return document
         except Exception:
             return None
 
     @staticmethod
-    def list_documents() -> List[dict]:
-        """List all documents ordered by upload date"""
+    def get_document_status(document_id: str) -> Optional[dict]:
+        """Get only the status fields of a document"""
+        document = CosmosDBService.get_document(document_id)
+        if document is None:
+            return None
+        return {
+            field: document[field]
+            for field in STATUS_PROJECTION
+            if field != "_id" and field in document
+        }
+
+    @staticmethod
+    async def find_by_content_hash_async(content_hash: str) -> Optional[dict]:
+        """Find a stored document with the same content fingerprint"""
+        collection = AzureClients.get_async_cosmos_container()
+        return await collection.find_one(
+            {"content_hash": content_hash, "status": {"$ne": "failed"}},
+            {
+                "_id": 0,
+                "document_id": 1,
+                "source_document_id": 1,
+                "blob_name": 1,
+                "blob_url": 1,
+                "status": 1,
+                "processed": 1,
+                "indexer_triggered_at": 1,
+                "completed_at": 1,
+            },
+        )
+
+    @staticmethod
+    def list_documents_page(
+        limit: int,
+        session_id: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> Tuple[List[dict], bool]:
+        """
+        List one page of documents, newest first (keyset pagination)
+
+        Documents are ordered by (upload_date, document_id) descending and
+        the page starts right after the `after` key, so every page is an
+        index range scan regardless of how many documents exist.
+
+        Args:
+            limit: Maximum number of documents to return
+            session_id: Optional session filter
+            after: (upload_date, document_id) of the last document of the previous page
+
+        Returns:
+            Tuple of (documents, has_more)
+        """
+        query = {}
+        if session_id:
+            query["session_id"] = session_id
+        if after:
+            upload_date, document_id = after
+            query["$or"] = [
+                {"upload_date": {"$lt": upload_date}},
+                {"upload_date": upload_date, "document_id": {"$lt": document_id}},
+            ]
+
         collection = AzureClients.get_cosmos_container()
-        documents = list(collection.find().sort("upload_date", -1))
-        for doc in documents:
-            if '_id' in doc:
-                doc['_id'] = str(doc['_id'])
-        return documents
+        cursor = collection.find(query, LIST_PROJECTION).sort(
+            [("upload_date", DESCENDING), ("document_id", DESCENDING)]
+        ).limit(limit + 1)
+
+        documents = []
+        has_more = False
+        for doc in cursor:
+            if len(documents) == limit:
+                has_more = True
+                break
+            documents.append(doc)
+        return documents, has_more
 
     @staticmethod
-    def list_documents_by_session(session_id: str) -> List[dict]:
-        """List documents for specific session"""
+    def get_session_indexed_document_ids(session_id: str) -> List[str]:
+        """
+        IDs under which a session's documents are indexed (cached per session)
+
+        Deduplicated uploads are indexed under their source document's ID,
+        so that ID is returned in their place.
+        """
+        cached = session_scope_cache.get(session_id)
+        if cached is not None:
+            return list(cached)
+
         collection = AzureClients.get_cosmos_container()
-        documents = list(collection.find({"session_id": session_id}).sort("upload_date", -1))
-        for doc in documents:
-            if '_id' in doc:
-                doc['_id'] = str(doc['_id'])
-        return documents
+        cursor = collection.find(
+            {"session_id": session_id, "status": {"$ne": "failed"}},
+            {"_id": 0, "document_id": 1, "source_document_id": 1},
+        )
+        document_ids = sorted({
+            doc.get("source_document_id") or doc["document_id"] for doc in cursor
+        })
+        session_scope_cache.set(session_id, tuple(document_ids))
+        return document_ids
 
     @staticmethod
     def update_document(document_id: str, update_data: dict) -> dict:
@@ -55,14 +250,190 @@ class CosmosDBService:
         )
         if result and '_id' in result:
             result['_id'] = str(result['_id'])
+        if result:
+            _cache_document(result)
+        else:
+            document_cache.invalidate(document_id)
         return result
 
+    @staticmethod
+    async def update_document_async(document_id: str, update_data: dict) -> dict:
+        """Update document metadata without blocking the event loop"""
+        collection = AzureClients.get_async_cosmos_container()
+        result = await collection.find_one_and_update(
+            {"document_id": document_id},
+            {"$set": update_data},
+            return_document=True
+        )
+        if result and '_id' in result:
+            result['_id'] = str(result['_id'])
+        if result:
+            _cache_document(result)
+        else:
+            document_cache.invalidate(document_id)
+        return result
+
+    @staticmethod
+    async def list_session_statuses_async(session_id: str) -> List[dict]:
+        """List status fields of a session's documents"""
+        collection = AzureClients.get_async_cosmos_container()
+        cursor = collection.find({"session_id": session_id}, STATUS_PROJECTION)
+        return await cursor.to_list(length=None)
+
+    @staticmethod
+    async def list_pending_documents_async(limit: int) -> List[dict]:
+        """List documents that are still waiting to be indexed, oldest first"""
+        collection = AzureClients.get_async_cosmos_container()
+        cursor = collection.find(
+            {"status": {"$in": ["uploaded", "processing"]}},
+            {
+                "_id": 0,
+                "document_id": 1,
+                "source_document_id": 1,
+                "session_id": 1,
+                "status": 1,
+                "upload_date": 1,
+                "indexer_scheduled_at": 1,
+                "indexer_triggered_at": 1,
+            },
+        ).sort("upload_date", 1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    @staticmethod
+    async def latest_completed_at_async() -> Optional[str]:
+        """completed_at of the most recently completed document, or None"""
+        collection = AzureClients.get_async_cosmos_container()
+        document = await collection.find_one(
+            {"status": "completed", "completed_at": {"$exists": True}},
+            {"_id": 0, "completed_at": 1},
+            sort=[("completed_at", -1)],
+        )
+        return document["completed_at"] if document else None
+
+    @staticmethod
+    async def list_failed_documents_async(limit: int, failed_since: str) -> List[dict]:
+        """List documents failed by the indexer since a given time, most recent first"""
+        collection = AzureClients.get_async_cosmos_container()
+        cursor = collection.find(
+            {"status": "failed", "failed_at": {"$gte": failed_since}},
+            {
+                "_id": 0,
+                "document_id": 1,
+                "source_document_id": 1,
+                "session_id": 1,
+                "status": 1,
+            },
+        ).sort("failed_at", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    @staticmethod
+    async def bulk_update_documents_async(
+        updates: Dict[str, dict], expected_status: Optional[Dict[str, str]] = None
+    ) -> int:
+        """
+        Apply per-document updates with a single bulk_write
+
+        Args:
+            updates: Mapping of document_id to the fields to set
+            expected_status: Optional mapping of document_id to the status the
+                document must still have for its update to apply
+
+        Returns:
+            Number of modified documents
+        """
+        if not updates:
+            return 0
+        expected_status = expected_status or {}
+        operations = []
+        for document_id, update_data in updates.items():
+            query = {"document_id": document_id}
+            if document_id in expected_status:
+                query["status"] = expected_status[document_id]
+            operations.append(UpdateOne(query, {"$set": update_data}))
+
+        collection = AzureClients.get_async_cosmos_container()
+        result = await collection.bulk_write(operations, ordered=False)
+        document_cache.invalidate(*updates)
+        return result.modified_count
+
+    @staticmethod
+    async def update_documents_async(
+        document_ids: List[str], update_data: dict, expected_status: Optional[str] = None
+    ) -> int:
+        """Apply the same update to several documents, optionally only those in `expected_status`"""
+        collection = AzureClients.get_async_cosmos_container()
+        query = {"document_id": {"$in": document_ids}}
+        if expected_status:
+            query["status"] = expected_status
+        result = await collection.update_many(query, {"$set": update_data})
+        document_cache.invalidate(*document_ids)
+        return result.modified_count
+
     @staticmethod
     def delete_document(document_id: str) -> bool:
         """Delete document from Cosmos DB"""
         try:
             collection = AzureClients.get_cosmos_container()
             result = collection.delete_one({"document_id": document_id})
+            document_cache.invalidate(document_id)
             return result.deleted_count > 0
         except Exception:
             return False
+
+    @staticmethod
+    async def create_upload_session_async(upload_session: dict) -> dict:
+        """Create a resumable upload session record"""
+        collection = AzureClients.get_async_uploads_container()
+        result = await collection.insert_one(upload_session)
+        upload_session['_id'] = str(result.inserted_id)
+        return upload_session
+
+    @staticmethod
+    async def get_upload_session_async(upload_id: str) -> Optional[dict]:
+        """Get resumable upload session by ID"""
+        collection = AzureClients.get_async_uploads_container()
+        upload_session = await collection.find_one({"upload_id": upload_id})
+        if upload_session and '_id' in upload_session:
+            upload_session['_id'] = str(upload_session['_id'])
+        return upload_session
+
+    @staticmethod
+    async def advance_upload_session_async(
+        upload_id: str, offset: int, new_offset: int, block_id: str, updated_at: str
+    ) -> Optional[dict]:
+        """
+        Record a staged chunk, only if the session is still at `offset`
+
+        Returns the updated session, or None if another request already
+        moved the offset (or the session is no longer in progress).
+        """
+        collection = AzureClients.get_async_uploads_container()
+        result = await collection.find_one_and_update(
+            {"upload_id": upload_id, "offset": offset, "status": "in_progress"},
+            {
+                "$set": {"offset": new_offset, "updated_at": updated_at},
+                "$push": {"block_ids": block_id},
+            },
+            return_document=True
+        )
+        if result and '_id' in result:
+            result['_id'] = str(result['_id'])
+        return result
+
+    @staticmethod
+    async def update_upload_session_async(
+        upload_id: str, update_data: dict, expected_status: Optional[str] = None
+    ) -> Optional[dict]:
+        """Update resumable upload session fields, optionally only from `expected_status`"""
+        collection = AzureClients.get_async_uploads_container()
+        query = {"upload_id": upload_id}
+        if expected_status:
+            query["status"] = expected_status
+        result = await collection.find_one_and_update(
+            query,
+            {"$set": update_data},
+            return_document=True
+        )
+        if result and '_id' in result:
+            result['_id'] = str(result['_id'])
+        return result
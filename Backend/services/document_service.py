@@ -1,20 +1,35 @@
+import asyncio
+import hashlib
 import os
 import uuid
-from datetime import datetime, timezone
-from typing import Tuple, Optional
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set
 from fastapi import HTTPException, UploadFile
-from config.settings import ALLOWED_EXTENSIONS, MAX_FILE_SIZE
+from config.settings import (
+    ALLOWED_EXTENSIONS,
+    DOCUMENTS_PAGE_SIZE,
+    MAX_FILE_SIZE,
+    UPLOAD_BATCH_CONCURRENCY,
+    UPLOAD_BATCH_MAX_FILES,
+    UPLOAD_CHUNK_SIZE,
+)
 from services.blob_service import BlobStorageService
 from services.cosmos_service import CosmosDBService
-from services.ai_search_service import AISearchService
+from services.extraction_service import ExtractionService
+from services.indexer_scheduler import IndexerScheduler
+from utils.pagination import decode_cursor, encode_cursor
 
 
 class DocumentService:
     @staticmethod
-    def validate_file(file: UploadFile, file_content: bytes) -> Tuple[str, int]:
-        """Validate file extension and size"""
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        file_size = len(file_content)
+    def validate_file(file: UploadFile) -> str:
+        """Validate file extension before any content is read"""
+        return DocumentService.validate_filename(file.filename)
+
+    @staticmethod
+    def validate_filename(filename: str) -> str:
+        """Validate file extension and return it"""
+        file_ext = os.path.splitext(filename)[1].lower()
 
         if file_ext not in ALLOWED_EXTENSIONS:
             raise HTTPException(
@@ -22,32 +37,76 @@ class DocumentService:
                 detail=f"File type {file_ext} not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}",
             )
 
+        return file_ext
+
+    @staticmethod
+    def validate_file_size(file_size: int) -> None:
+        """Validate the number of bytes received so far against the size limit"""
         if file_size > MAX_FILE_SIZE:
             raise HTTPException(
                 status_code=400,
                 detail=f"File size {file_size / (1024 * 1024):.2f}MB exceeds maximum allowed size of 100MB",
             )
 
-        if file_size == 0:
+    @staticmethod
+    async def stream_file(
+        file: UploadFile, received: dict, chunk_size: int = UPLOAD_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        Read an uploaded file in fixed-size chunks, validating size as it streams
+
+        Args:
+            file: Uploaded file
+            received: Dict updated in place with the running "size" in bytes
+                and, once the stream is exhausted, the SHA-256 "content_hash"
+            chunk_size: Number of bytes per chunk
+
+        Yields:
+            File content chunks
+        """
+        received["size"] = 0
+        sha256 = hashlib.sha256()
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            received["size"] += len(chunk)
+            DocumentService.validate_file_size(received["size"])
+            sha256.update(chunk)
+            yield chunk
+
+        if received["size"] == 0:
             raise HTTPException(status_code=400, detail="File is empty")
 
-        return file_ext, file_size
+        received["content_hash"] = sha256.hexdigest()
 
     @staticmethod
-    async def upload_document(file: UploadFile, session_id: str) -> dict:
-        """Handle complete document upload flow: validation -> blob storage -> cosmos db"""
-        # Read file content
-        file_content = await file.read()
+    def indexed_document_id(document: dict) -> str:
+        """Document ID under which a document's blob is stored and indexed"""
+        return document.get("source_document_id") or document.get("document_id")
 
-        # Validate file
-        file_ext, file_size = DocumentService.validate_file(file, file_content)
+    @staticmethod
+    async def store_file(file: UploadFile, session_id: str) -> dict:
+        """
+        Validate and store one uploaded file in Blob Storage
+
+        Returns the document metadata to persist; nothing is written to
+        Cosmos DB. Duplicates of already stored content carry a
+        `source_document_id` and leave the blob uncommitted.
+        """
+        # Validate file type before reading any content
+        file_ext = DocumentService.validate_file(file)
 
         # Generate unique document ID
         document_id = str(uuid.uuid4())
         blob_name = f"{document_id}/{file.filename}"
 
-        # Upload to Blob Storage
-        blob_url = BlobStorageService.upload_file(blob_name, file_content)
+        # Stage blocks in Blob Storage, validating size and hashing chunk by chunk
+        received = {"size": 0}
+        block_ids = await BlobStorageService.stage_stream(
+            blob_name, DocumentService.stream_file(file, received)
+        )
+        content_hash = received["content_hash"]
 
         # Prepare metadata
         document_metadata = {
@@ -56,34 +115,150 @@ class DocumentService:
             "session_id": session_id,
             "filename": file.filename,
             "blob_name": blob_name,
-            "blob_url": blob_url,
-            "file_size": file_size,
+            "file_size": received["size"],
             "file_type": file_ext,
+            "content_hash": content_hash,
             "status": "uploaded",
             "upload_date": datetime.now(timezone.utc).isoformat(),
             "processed": False,
         }
 
+        # Same content already stored: point at the existing blob and skip
+        # the commit and the indexer run (staged blocks are discarded)
+        if await DocumentService.use_existing_copy(document_metadata):
+            return document_metadata
+
+        document_metadata["blob_url"] = await BlobStorageService.commit_blocks(
+            blob_name, block_ids, BlobStorageService.index_metadata(document_metadata)
+        )
+        return document_metadata
+
+    @staticmethod
+    async def use_existing_copy(document_metadata: dict) -> bool:
+        """
+        Point document metadata at an already stored document with the same content_hash
+
+        Returns:
+            True if a copy was found and the metadata now refers to it
+        """
+        existing = await CosmosDBService.find_by_content_hash_async(document_metadata["content_hash"])
+        if not existing:
+            return False
+
+        document_metadata.update({
+            "blob_name": existing.get("blob_name"),
+            "blob_url": existing.get("blob_url"),
+            "source_document_id": DocumentService.indexed_document_id(existing),
+            "status": existing.get("status", "uploaded"),
+            "processed": existing.get("processed", False),
+        })
+        for field in ("indexer_triggered_at", "completed_at"):
+            if existing.get(field):
+                document_metadata[field] = existing[field]
+        return True
+
+    @staticmethod
+    def upload_result(document_metadata: dict, indexer_scheduled: bool) -> dict:
+        """Build the upload response for a stored document"""
+        result = {
+            "message": "File uploaded successfully",
+            "document_id": document_metadata["document_id"],
+            "filename": document_metadata["filename"],
+            "size": document_metadata["file_size"],
+            "status": document_metadata["status"],
+            "indexer_scheduled": indexer_scheduled,
+        }
+        if document_metadata.get("source_document_id"):
+            result["duplicate_of"] = document_metadata["source_document_id"]
+        return result
+
+    @staticmethod
+    async def upload_document(file: UploadFile, session_id: str) -> dict:
+        """Handle complete document upload flow: validation -> blob storage -> cosmos db"""
+        document_metadata = await DocumentService.store_file(file, session_id)
+        return await DocumentService.register_document(document_metadata)
+
+    @staticmethod
+    async def register_document(document_metadata: dict) -> dict:
+        """Save metadata of a stored document and queue it for indexing"""
+        # Duplicates reuse an already indexed blob
+        duplicate = bool(document_metadata.get("source_document_id"))
+        if not duplicate:
+            document_metadata["indexer_scheduled_at"] = datetime.now(timezone.utc).isoformat()
+
         # Save metadata to Cosmos DB
-        CosmosDBService.create_document(document_metadata)
+        await CosmosDBService.create_document_async(document_metadata)
 
-        # Trigger AI Search indexer to process the new document
-        indexer_result = AISearchService.trigger_indexer()
-        
-        # Update status to processing if indexer was triggered
-        if indexer_result.get("status") == "success":
-            CosmosDBService.update_document(document_id, {
-                "status": "processing",
-                "indexer_triggered_at": datetime.now(timezone.utc).isoformat()
-            })
+        if duplicate:
+            return DocumentService.upload_result(document_metadata, indexer_scheduled=False)
+
+        # Local extraction indexes the document itself and only falls back
+        # to the indexer when it cannot; without it the scheduler coalesces
+        # indexer runs in the background
+        if not ExtractionService.submit(document_metadata):
+            IndexerScheduler.schedule([document_metadata["document_id"]])
+
+        return DocumentService.upload_result(document_metadata, indexer_scheduled=True)
+
+    @staticmethod
+    async def upload_documents(files: List[UploadFile], session_id: str) -> dict:
+        """
+        Upload a batch of documents with bounded parallelism
+
+        Files are transferred to Blob Storage concurrently, all metadata is
+        written with a single insert_many and the whole batch is queued for
+        one indexer run. A failing file does not fail the batch; its error
+        is reported in the per-file results.
+        """
+        if not files:
+            raise HTTPException(status_code=400, detail="No files provided")
+
+        if len(files) > UPLOAD_BATCH_MAX_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many files: {len(files)}. Maximum per batch is {UPLOAD_BATCH_MAX_FILES}",
+            )
+
+        semaphore = asyncio.Semaphore(UPLOAD_BATCH_CONCURRENCY)
+
+        async def store(file: UploadFile) -> dict:
+            async with semaphore:
+                return await DocumentService.store_file(file, session_id)
+
+        outcomes = await asyncio.gather(
+            *(store(file) for file in files), return_exceptions=True
+        )
+
+        stored = [o for o in outcomes if isinstance(o, dict)]
+
+        # Duplicates reuse an already indexed blob
+        new_documents = [d for d in stored if not d.get("source_document_id")]
+        scheduled_at = datetime.now(timezone.utc).isoformat()
+        for document_metadata in new_documents:
+            document_metadata["indexer_scheduled_at"] = scheduled_at
+
+        if stored:
+            await CosmosDBService.create_documents_async(stored)
+
+        new_document_ids = [d["document_id"] for d in new_documents]
+        IndexerScheduler.schedule([
+            d["document_id"] for d in new_documents if not ExtractionService.submit(d)
+        ])
+
+        results = []
+        for file, outcome in zip(files, outcomes):
+            if isinstance(outcome, dict):
+                scheduled = not outcome.get("source_document_id")
+                results.append({"success": True, **DocumentService.upload_result(outcome, scheduled)})
+            else:
+                error = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+                results.append({"success": False, "filename": file.filename, "error": error})
 
         return {
-            "message": "File uploaded successfully",
-            "document_id": document_id,
-            "filename": file.filename,
-            "size": file_size,
-            "status": "processing" if indexer_result.get("status") == "success" else "uploaded",
-            "indexer_triggered": indexer_result.get("status") == "success"
+            "results": results,
+            "uploaded": len(stored),
+            "failed": len(files) - len(stored),
+            "indexer_scheduled": bool(new_document_ids),
         }
 
     @staticmethod
@@ -95,77 +270,129 @@ class DocumentService:
         return document
 
     @staticmethod
-    def list_documents(session_id: Optional[str] = None) -> dict:
-        """List all documents or filter by session"""
-        if session_id:
-            documents = CosmosDBService.list_documents_by_session(session_id)
-        else:
-            documents = CosmosDBService.list_documents()
-        
-        # Auto-update status for processing documents
-        from services.ai_search_service import AISearchService
-        from datetime import timedelta
-        
-        current_time = datetime.now(timezone.utc)
+    def list_documents(
+        session_id: Optional[str] = None,
+        limit: int = DOCUMENTS_PAGE_SIZE,
+        cursor: Optional[str] = None,
+    ) -> dict:
+        """List one page of documents (optionally filtered by session), newest first"""
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        documents, has_more = CosmosDBService.list_documents_page(limit, session_id, after)
+
+        next_cursor = None
+        if has_more:
+            last = documents[-1]
+            next_cursor = encode_cursor(last["upload_date"], last["document_id"])
         
+        return {"documents": documents, "count": len(documents), "next_cursor": next_cursor}
+
+    @staticmethod
+    def check_document_status(document_id: str) -> dict:
+        """Get document indexing status (kept up to date by the StatusReconciler)"""
+        document = CosmosDBService.get_document_status(document_id)
+
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        status = document.get("status", "unknown")
+        if status == "completed":
+            message = "Document is indexed and ready"
+        elif status == "failed":
+            message = document.get("error_message") or "Document indexing failed"
+        else:
+            message = "Document is being indexed..."
+
+        return {"document_id": document_id, "status": status, "message": message}
+
+    @staticmethod
+    def status_updates(
+        documents: List[dict],
+        indexed_ids: Set[str],
+        current_time: datetime,
+        indexer_status: Optional[dict] = None,
+    ) -> Dict[str, dict]:
+        """
+        Compute status transitions for pending documents
+
+        - indexed documents are completed (including previously failed ones)
+        - processing documents fail if the indexer run that ended after
+          they were triggered reported an error for their blob
+        - processing documents are assumed completed 2 minutes after the
+          indexer was triggered (the index check might miss them)
+        - uploaded documents are assumed completed after 1 minute (in case
+          the indexer trigger failed but the document was uploaded), unless
+          they are still queued for local extraction or an indexer run
+          (indexer_scheduled_at)
+
+        Returns:
+            Mapping of document_id to the fields to update
+        """
+        completed = {
+            "status": "completed",
+            "completed_at": current_time.isoformat(),
+            "processed": True
+        }
+
+        last_result = (indexer_status or {}).get("lastResult") or {}
+        run_ended_at = DocumentService._parse_timestamp(last_result.get("endTime"))
+        # Item errors are keyed by blob path ("<document_id>/<filename>")
+        run_errors = [
+            (error.get("key") or "", error.get("errorMessage"))
+            for error in last_result.get("errors") or []
+        ]
+
+        updates = {}
         for doc in documents:
-            if doc.get("status") == "processing":
-                # Check if indexed
-                is_indexed = AISearchService.check_document_indexed(doc.get("document_id"))
-                if is_indexed:
-                    # Update to completed
-                    CosmosDBService.update_document(doc.get("document_id"), {
-                        "status": "completed",
-                        "completed_at": current_time.isoformat(),
-                        "processed": True
-                    })
-                    doc["status"] = "completed"
-                    doc["processed"] = True
-                else:
-                    # Auto-complete after 2 minutes if still processing
-                    # (Indexer might have completed but check_document_indexed might fail)
-                    indexed_at = doc.get("indexer_triggered_at")
-                    if indexed_at:
-                        try:
-                            # Parse ISO format with timezone
-                            indexed_time = datetime.fromisoformat(indexed_at.replace('Z', '+00:00'))
-                            time_elapsed = current_time - indexed_time
-                            
-                            if time_elapsed > timedelta(minutes=2):
-                                # Assume completed after 2 minutes
-                                CosmosDBService.update_document(doc.get("document_id"), {
-                                    "status": "completed",
-                                    "completed_at": current_time.isoformat(),
-                                    "processed": True
-                                })
-                                doc["status"] = "completed"
-                                doc["processed"] = True
-                        except Exception as e:
-                            print(f"Error parsing indexer_triggered_at: {e}")
-            
-            # Also auto-complete uploaded documents after 1 minute
-            # (In case indexer trigger failed but document was uploaded)
-            elif doc.get("status") == "uploaded":
-                upload_date = doc.get("upload_date")
-                if upload_date:
-                    try:
-                        # Parse ISO format with timezone
-                        upload_time = datetime.fromisoformat(upload_date.replace('Z', '+00:00'))
-                        time_elapsed = current_time - upload_time
-                        
-                        if time_elapsed > timedelta(minutes=1):
-                            # Auto-complete after 1 minute
-                            CosmosDBService.update_document(doc.get("document_id"), {
-                                "status": "completed",
-                                "completed_at": current_time.isoformat(),
-                                "processed": True
-                            })
-                            doc["status"] = "completed"
-                            doc["processed"] = True
-                    except Exception as e:
-                        print(f"Error parsing upload_date: {e}")
-        
-        return {"documents": documents, "count": len(documents)}
+            status = doc.get("status")
+            if DocumentService.indexed_document_id(doc) in indexed_ids:
+                updates[doc.get("document_id")] = dict(completed)
+                continue
+
+            if status == "processing":
+                started_time = DocumentService._parse_timestamp(doc.get("indexer_triggered_at"))
+                timeout = timedelta(minutes=2)
+
+                if started_time and run_ended_at and run_ended_at > started_time:
+                    blob_prefix = f"/{DocumentService.indexed_document_id(doc)}/"
+                    error_message = next(
+                        (message for key, message in run_errors if blob_prefix in key), None
+                    )
+                    if error_message is not None:
+                        updates[doc.get("document_id")] = {
+                            "status": "failed",
+                            "failed_at": current_time.isoformat(),
+                            "error_message": error_message or "Indexer failed to index this document",
+                        }
+                        continue
+            elif status == "uploaded":
+                if doc.get("indexer_scheduled_at"):
+                    # Waiting for local extraction, the scheduler's debounce
+                    # or a run in progress
+                    continue
+                started_time = DocumentService._parse_timestamp(doc.get("upload_date"))
+                timeout = timedelta(minutes=1)
+            else:
+                continue
+
+            if started_time and current_time - started_time > timeout:
+                updates[doc.get("document_id")] = dict(completed)
+
+        return updates
+
+    @staticmethod
+    def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+        """Parse an ISO timestamp (with 'Z' or offset); None if missing or invalid"""
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError as e:
+            print(f"Error parsing timestamp {value}: {e}")
+            return None
 
     @staticmethod
     def validate_document_access(document_id: str, session_id: str) -> bool:
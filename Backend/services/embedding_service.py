@@ -2,15 +2,48 @@
 Embedding Service for generating query embeddings
 Uses Azure OpenAI text-embedding-3-small (same as skillset)
 """
-from typing import List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import asyncio
+import hashlib
 import logging
-from openai import AzureOpenAI
+import random
+import re
+import threading
+import time
+import numpy as np
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AzureOpenAI,
+    InternalServerError,
+    NotFoundError,
+    RateLimitError,
+)
 from config.settings import (
     AZURE_OPENAI_ENDPOINT,
     AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_API_VERSION,
-    AZURE_OPENAI_EMBEDDING_DEPLOYMENT
+    AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
+    EMBEDDING_CACHE_DIR,
+    EMBEDDING_CACHE_DISK_SLOTS,
+    EMBEDDING_CACHE_MAX_ENTRIES,
+    EMBEDDING_BATCH_MAX_SIZE,
+    EMBEDDING_BATCH_WAIT_MS,
+    EMBEDDING_BULK_CONCURRENCY,
+    EMBEDDING_BULK_MAX_RETRIES,
+    EMBEDDING_BULK_REQUESTS_PER_MINUTE,
+    EMBEDDING_CACHE_TTL_SECONDS,
+    EMBEDDING_DEPLOYMENT_FALLBACKS,
+    EMBEDDING_DEPLOYMENT_REVALIDATE_SECONDS,
+    EMBEDDING_INPUT_MAX_TOKENS,
+    EMBEDDING_MAX_IN_FLIGHT,
+    EMBEDDING_REQUEST_MAX_ITEMS,
+    EMBEDDING_REQUEST_MAX_TOKENS,
 )
+from utils.cache import TTLCache
+from utils.embedding_store import EmbeddingStore
+from utils.tokens import count_tokens, truncate_tokens
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +52,13 @@ logger = logging.getLogger(__name__)
 # Singleton client instance
 _embedding_client = None
 
+# Two-tier embedding cache keyed on sha256(deployment, normalized text):
+# float32 arrays in memory, then the memory-mapped store on disk
+_memory_cache = TTLCache("embeddings", EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_TTL_SECONDS)
+_disk_store = (
+    EmbeddingStore(EMBEDDING_CACHE_DIR, EMBEDDING_CACHE_DISK_SLOTS) if EMBEDDING_CACHE_DIR else None
+)
+
 
 def get_embedding_client() -> AzureOpenAI:
     """Get or create singleton Azure OpenAI client for embeddings"""
@@ -35,6 +75,241 @@ def get_embedding_client() -> AzureOpenAI:
     return _embedding_client
 
 
+def _is_deployment_not_found(error: Exception) -> bool:
+    return isinstance(error, NotFoundError) or "DeploymentNotFound" in str(error)
+
+
+class EmbeddingDeployment:
+    """
+    Resolves which embedding deployment to call, once
+
+    The configured deployment and the fallbacks are probed in order and the
+    first that answers is remembered, so steady-state embedding calls make
+    exactly one request. A background task re-validates the choice; if a
+    deployment later disappears, the next call re-resolves.
+    """
+
+    _name: Optional[str] = None
+    _error: Optional[str] = None
+    _lock = threading.Lock()
+    _task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def candidates() -> List[str]:
+        return list(dict.fromkeys([AZURE_OPENAI_EMBEDDING_DEPLOYMENT, *EMBEDDING_DEPLOYMENT_FALLBACKS]))
+
+    @classmethod
+    def get(cls) -> str:
+        """Name of the working deployment (probes on first use)"""
+        name = cls._name
+        if name:
+            return name
+        if cls._error:
+            raise Exception(cls._error)
+        return cls.resolve()
+
+    @classmethod
+    def resolve(cls, force: bool = False) -> str:
+        """
+        Probe the candidate deployments and remember the first that works
+
+        Args:
+            force: Probe even if a deployment is already resolved
+
+        Raises:
+            Exception: If embeddings are not configured or no candidate
+                deployment exists (the error is remembered until the next
+                re-validation so calls fail fast)
+        """
+        with cls._lock:
+            if cls._name and not force:
+                return cls._name
+            if not all([AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_KEY]):
+                raise Exception("Azure OpenAI embeddings not configured")
+
+            client = get_embedding_client()
+            candidates = cls.candidates()
+            last_error = None
+            for deployment_name in candidates:
+                try:
+                    client.embeddings.create(model=deployment_name, input="ping", encoding_format="float")
+                except Exception as e:
+                    if _is_deployment_not_found(e):
+                        logger.warning(f"⚠️ Embedding deployment '{deployment_name}' not found")
+                        last_error = e
+                        continue
+                    # Transient or auth error: keep the current choice
+                    raise
+                if deployment_name != cls._name:
+                    logger.info(f"✅ Using embedding deployment '{deployment_name}'")
+                cls._name = deployment_name
+                cls._error = None
+                return deployment_name
+
+            cls._name = None
+            cls._error = (
+                f"No working embedding deployment. Tried: {', '.join(candidates)}. "
+                f"Last error: {str(last_error)}. "
+                f"Set AZURE_OPENAI_EMBEDDING_DEPLOYMENT to the name of your embedding deployment."
+            )
+            logger.error(f"❌ {cls._error}")
+            raise Exception(cls._error)
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Forget the resolved deployment (it returned DeploymentNotFound)"""
+        cls._name = None
+
+    @classmethod
+    def start(cls) -> None:
+        """Resolve in the background and keep re-validating (called on application startup)"""
+        if cls._task is None and all([AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_KEY]):
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Stop re-validation (called on application shutdown)"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(cls.resolve, True)
+            except Exception as e:
+                logger.warning(f"⚠️ Embedding deployment check failed: {str(e)[:200]}")
+            await asyncio.sleep(EMBEDDING_DEPLOYMENT_REVALIDATE_SECONDS)
+
+
+class EmbeddingDispatcher:
+    """
+    Coalesces concurrent single-text embedding requests into batched calls
+
+    Callers enqueue a text and block on a future. A collector thread waits
+    until EMBEDDING_BATCH_MAX_SIZE texts are queued or EMBEDDING_BATCH_WAIT_MS
+    has passed since the oldest one, sends them as one embeddings request
+    (at most EMBEDDING_MAX_IN_FLIGHT requests at a time) and fans the
+    vectors back out to the waiting callers.
+    """
+
+    _pending: List[Tuple[str, str, Future]] = []
+    _condition = threading.Condition()
+    _collector: Optional[threading.Thread] = None
+    _executor: Optional[ThreadPoolExecutor] = None
+    _in_flight = threading.BoundedSemaphore(max(1, EMBEDDING_MAX_IN_FLIGHT))
+
+    @classmethod
+    def embed(cls, deployment_name: str, text: str) -> List[float]:
+        """Embed one text as part of the next batch (blocks until it is done)"""
+        future: Future = Future()
+        with cls._condition:
+            cls._ensure_started()
+            cls._pending.append((deployment_name, text, future))
+            cls._condition.notify()
+        return future.result()
+
+    @classmethod
+    def _ensure_started(cls) -> None:
+        if cls._collector is None or not cls._collector.is_alive():
+            cls._executor = ThreadPoolExecutor(
+                max_workers=max(1, EMBEDDING_MAX_IN_FLIGHT), thread_name_prefix="embedding-batch"
+            )
+            cls._collector = threading.Thread(
+                target=cls._collect, name="embedding-dispatcher", daemon=True
+            )
+            cls._collector.start()
+
+    @classmethod
+    def _collect(cls) -> None:
+        while True:
+            with cls._condition:
+                while not cls._pending:
+                    cls._condition.wait()
+                deadline = time.monotonic() + EMBEDDING_BATCH_WAIT_MS / 1000
+                while len(cls._pending) < EMBEDDING_BATCH_MAX_SIZE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    cls._condition.wait(remaining)
+
+                # One deployment per request
+                deployment_name = cls._pending[0][0]
+                batch = [item for item in cls._pending if item[0] == deployment_name]
+                batch = batch[:EMBEDDING_BATCH_MAX_SIZE]
+                taken = {id(item) for item in batch}
+                cls._pending = [item for item in cls._pending if id(item) not in taken]
+
+            cls._in_flight.acquire()
+            cls._executor.submit(cls._send, deployment_name, batch)
+
+    @classmethod
+    def _send(cls, deployment_name: str, batch: List[Tuple[str, str, Future]]) -> None:
+        try:
+            # Identical texts in one window share a single input
+            texts = list(dict.fromkeys(text for _, text, _ in batch))
+            response = get_embedding_client().embeddings.create(
+                model=deployment_name,
+                input=texts,
+                encoding_format="float"
+            )
+            vectors = {
+                texts[item.index]: item.embedding
+                for item in response.data
+            }
+            if len(batch) > 1:
+                logger.info(f"📦 Embedded {len(batch)} queries in one request ({len(texts)} distinct)")
+            for _, text, future in batch:
+                future.set_result(vectors[text])
+        except Exception as e:
+            if _is_deployment_not_found(e):
+                EmbeddingDeployment.invalidate()
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            cls._in_flight.release()
+
+
+def _cache_key(deployment: str, text: str) -> bytes:
+    """Digest of the deployment and the whitespace-normalized text"""
+    normalized = re.sub(r"\s+", " ", text).strip()
+    return hashlib.sha256(f"{deployment}\0{normalized}".encode("utf-8")).digest()
+
+
+def get_cached_embedding(deployment: str, text: str) -> Optional[np.ndarray]:
+    """Cached float32 vector for text, from memory or disk"""
+    key = _cache_key(deployment, text)
+    vector = _memory_cache.get(key)
+    if vector is None and _disk_store is not None:
+        try:
+            vector = _disk_store.lookup(key)
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding disk cache read failed: {str(e)[:100]}")
+            vector = None
+        if vector is not None:
+            _memory_cache.set(key, vector)
+    return vector
+
+
+def cache_embedding(deployment: str, text: str, embedding: List[float]) -> np.ndarray:
+    """Store a vector in both cache tiers as float32"""
+    key = _cache_key(deployment, text)
+    vector = np.asarray(embedding, dtype=np.float32)
+    _memory_cache.set(key, vector)
+    if _disk_store is not None:
+        try:
+            _disk_store.put(key, vector)
+        except Exception as e:
+            logger.warning(f"⚠️ Embedding disk cache write failed: {str(e)[:100]}")
+    return vector
+
+
 def generate_query_embedding(query: str) -> List[float]:
     """
     Generate embedding vector for a search query
@@ -49,80 +324,151 @@ def generate_query_embedding(query: str) -> List[float]:
         Exception: If embedding generation fails
     """
     try:
+        deployment_name = EmbeddingDeployment.get()
+
+        cached = get_cached_embedding(deployment_name, query)
+        if cached is not None:
+            logger.info(f"⚡ Embedding cache hit for query: '{query[:50]}...'")
+            return cached.tolist()
+
         logger.info(f"Generating embedding for query: '{query[:50]}...'")
         
-        client = get_embedding_client()
-        
-        # Try configured deployment first, then fallbacks
-        deployment_names = [
-            AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
-            "text-embedding-3-small",
-            "text-embedding-ada-002",
-            "embedding"
-        ]
-        
-        last_error = None
-        for deployment_name in deployment_names:
-            try:
-                logger.info(f"Trying deployment: {deployment_name}")
-                response = client.embeddings.create(
-                    model=deployment_name,
-                    input=query,
-                    encoding_format="float"
-                )
-                
-                embedding = response.data[0].embedding
-                logger.info(f"✅ Generated embedding with {len(embedding)} dimensions using {deployment_name}")
-                return embedding
-                
-            except Exception as e:
-                last_error = e
-                if "DeploymentNotFound" in str(e) or "404" in str(e):
-                    logger.warning(f"⚠️ Deployment '{deployment_name}' not found, trying next...")
-                    continue
-                else:
-                    # Other error, raise immediately
-                    raise
-        
-        # If we get here, all deployments failed
-        raise Exception(
-            f"Failed to find working embedding deployment. Tried: {', '.join(deployment_names)}. "
-            f"Last error: {str(last_error)}. "
-            f"Please check EMBEDDING_DEPLOYMENT_FIX.md for setup instructions."
-        )
+        embedding = EmbeddingDispatcher.embed(deployment_name, query)
+        logger.info(f"✅ Generated embedding with {len(embedding)} dimensions using {deployment_name}")
+        cache_embedding(deployment_name, query, embedding)
+        return embedding
         
     except Exception as e:
         logger.error(f"❌ Error generating embedding: {str(e)}")
         raise Exception(f"Failed to generate query embedding: {str(e)}")
 
 
-def generate_batch_embeddings(texts: List[str]) -> List[List[float]]:
+class _RequestRateLimiter:
+    """Spaces requests evenly to stay under a requests-per-minute limit"""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+_bulk_rate_limiter = _RequestRateLimiter(EMBEDDING_BULK_REQUESTS_PER_MINUTE)
+
+_RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+def _split_requests(texts: List[str], deployment_name: str) -> List[Tuple[int, List[str]]]:
+    """
+    Split texts into request-sized sub-batches by item count and token count
+
+    Returns:
+        List of (offset of the first text, texts) in input order
+    """
+    batches = []
+    start, current, current_tokens = 0, [], 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text, deployment_name)
+        if current and (
+            len(current) >= EMBEDDING_REQUEST_MAX_ITEMS
+            or current_tokens + tokens > EMBEDDING_REQUEST_MAX_TOKENS
+        ):
+            batches.append((start, current))
+            start, current, current_tokens = i, [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        batches.append((start, current))
+    return batches
+
+
+def _embed_request(deployment_name: str, texts: List[str]) -> List[List[float]]:
+    """Embed one sub-batch, retrying transient failures with exponential backoff"""
+    client = get_embedding_client()
+    for attempt in range(EMBEDDING_BULK_MAX_RETRIES + 1):
+        _bulk_rate_limiter.wait()
+        try:
+            response = client.embeddings.create(
+                model=deployment_name,
+                input=texts,
+                encoding_format="float"
+            )
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except _RETRYABLE_ERRORS as e:
+            if attempt == EMBEDDING_BULK_MAX_RETRIES:
+                raise
+            delay = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+            retry_after = getattr(getattr(e, "response", None), "headers", {}).get("retry-after")
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            logger.warning(
+                f"⚠️ Embedding request of {len(texts)} texts failed ({type(e).__name__}), "
+                f"retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+        except Exception as e:
+            if _is_deployment_not_found(e):
+                EmbeddingDeployment.invalidate()
+            raise
+
+
+def generate_batch_embeddings(texts: List[str]) -> np.ndarray:
     """
-    Generate embeddings for multiple texts in batch
-    More efficient than individual calls
+    Generate embeddings for many texts
+
+    Texts are cut to the model's input limit and split into sub-batches by
+    item count and token count; sub-batches run concurrently under the
+    configured parallelism and rate limit, and only failed sub-batches are
+    retried.
     
     Args:
         texts: List of text strings to embed
         
     Returns:
-        List of embedding vectors
+        float32 matrix of shape (len(texts), dimensions), rows in input order
     """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
     try:
-        logger.info(f"Generating batch embeddings for {len(texts)} texts")
-        
-        client = get_embedding_client()
-        
-        response = client.embeddings.create(
-            model=AZURE_OPENAI_EMBEDDING_DEPLOYMENT,
-            input=texts,
-            encoding_format="float"
-        )
-        
-        embeddings = [item.embedding for item in response.data]
-        
-        logger.info(f"✅ Generated {len(embeddings)} embeddings")
-        
-        return embeddings
+        deployment_name = EmbeddingDeployment.get()
+        inputs = [
+            truncate_tokens(text, EMBEDDING_INPUT_MAX_TOKENS, deployment_name) or " "
+            for text in texts
+        ]
+        batches = _split_requests(inputs, deployment_name)
+        logger.info(f"Generating batch embeddings for {len(texts)} texts in {len(batches)} request(s)")
+
+        started = time.monotonic()
+        matrix = None
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(EMBEDDING_BULK_CONCURRENCY, len(batches))),
+            thread_name_prefix="embedding-bulk",
+        ) as executor:
+            futures = {
+                executor.submit(_embed_request, deployment_name, batch): offset
+                for offset, batch in batches
+            }
+            for future, offset in futures.items():
+                vectors = np.asarray(future.result(), dtype=np.float32)
+                if matrix is None:
+                    matrix = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+                matrix[offset:offset + len(vectors)] = vectors
+
+        logger.info(f"✅ Generated {len(texts)} embeddings in {time.monotonic() - started:.1f}s")
+        return matrix
         
     except Exception as e:
         logger.error(f"❌ Error generating batch embeddings: {str(e)}")
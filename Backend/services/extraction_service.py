@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional, Set
+
+import numpy as np
+
+from config.settings import (
+    AZURE_SEARCH_KEY_FIELD,
+    AZURE_SEARCH_PASSAGE_INDEX_NAME,
+    EXTRACTION_WORKERS,
+    LOCAL_EXTRACTION_ENABLED,
+    PASSAGE_OVERLAP,
+    PASSAGE_SIZE,
+)
+from services.ai_search_service import AISearchService
+from services.blob_service import BlobStorageService
+from services.cosmos_service import CosmosDBService
+from services.embedding_service import generate_batch_embeddings
+from services.indexer_scheduler import IndexerScheduler
+from services.status_hub import StatusHub
+from utils.storage_path import encode_storage_path
+from utils.text_extraction import extract_passages
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionService:
+    """
+    Local extraction stage that runs after upload
+
+    PDF text, DOCX paragraphs and image OCR are extracted and chunked into
+    overlapping passages in a process pool (keeping CPU-heavy work off the
+    API worker), then pushed straight into the search index (or, when
+    AZURE_SEARCH_PASSAGE_INDEX_NAME is set, embedded and pushed into the
+    passage index). The document becomes queryable without waiting for
+    the blob indexer, which is only scheduled as a fallback when nothing
+    could be extracted or indexed locally (e.g. scanned PDFs without a
+    text layer), so documents are not indexed twice.
+    """
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _semaphore: Optional[asyncio.Semaphore] = None
+    _tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def start(cls) -> None:
+        """Create the worker pool (called on application startup)"""
+        if LOCAL_EXTRACTION_ENABLED and cls._executor is None:
+            cls._executor = ProcessPoolExecutor(
+                max_workers=EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            # Bounds how many downloaded files are held in memory at once
+            cls._semaphore = asyncio.Semaphore(EXTRACTION_WORKERS)
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Cancel pending extractions and shut the pool down (called on shutdown)"""
+        for task in list(cls._tasks):
+            task.cancel()
+        if cls._tasks:
+            await asyncio.gather(*cls._tasks, return_exceptions=True)
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    def submit(cls, document_metadata: dict) -> bool:
+        """Queue a stored document for local extraction; returns False if disabled"""
+        if cls._executor is None:
+            return False
+        task = asyncio.create_task(cls._process_safely(document_metadata))
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+        return True
+
+    @classmethod
+    async def _process_safely(cls, document_metadata: dict) -> None:
+        try:
+            await cls.process_document(document_metadata)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Local extraction failed for {document_metadata['document_id']}: {str(e)}")
+            IndexerScheduler.schedule([document_metadata["document_id"]])
+
+    @classmethod
+    async def process_document(cls, document_metadata: dict) -> int:
+        """
+        Extract, chunk and index one document
+
+        Returns:
+            Number of passages indexed
+        """
+        document_id = document_metadata["document_id"]
+
+        async with cls._semaphore:
+            file_content = await BlobStorageService.download_file_async(document_metadata["blob_name"])
+            loop = asyncio.get_running_loop()
+            passages = await loop.run_in_executor(
+                cls._executor,
+                extract_passages,
+                file_content,
+                document_metadata["file_type"],
+                PASSAGE_SIZE,
+                PASSAGE_OVERLAP,
+            )
+
+        if not passages:
+            # Nothing extractable locally; leave the document to the indexer
+            logger.info(f"No text extracted locally for {document_id}")
+            IndexerScheduler.schedule([document_id])
+            return 0
+
+        if AZURE_SEARCH_PASSAGE_INDEX_NAME:
+            vectors = await cls._embed_passages(document_id, passages)
+            indexed = await AISearchService.index_documents_async(
+                cls._passage_index_documents(document_metadata, passages, vectors),
+                index_name=AZURE_SEARCH_PASSAGE_INDEX_NAME,
+            )
+        else:
+            indexed = await AISearchService.index_documents_async(
+                cls._passage_documents(document_metadata, passages)
+            )
+
+        if indexed == 0:
+            logger.warning(f"No passages indexed for {document_id}; falling back to the indexer")
+            IndexerScheduler.schedule([document_id])
+            return 0
+
+        if indexed < len(passages):
+            # Some passages were rejected (207); leave the status to the
+            # reconciler rather than completing a document that is not fully
+            # searchable (no longer queued, so its upload timeout applies)
+            logger.warning(f"Indexed only {indexed}/{len(passages)} passages for {document_id}")
+            await CosmosDBService.update_document_async(document_id, {"indexer_scheduled_at": None})
+            return indexed
+
+        await CosmosDBService.update_document_async(document_id, {
+            "status": "completed",
+            "processed": True,
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+            "passage_count": indexed,
+        })
+        AISearchService.bump_index_version()
+        StatusHub.notify([document_metadata["session_id"]])
+        logger.info(f"Indexed {indexed} passages for {document_id}")
+        return indexed
+
+    @staticmethod
+    def _passage_documents(document_metadata: dict, passages: List[dict]) -> List[dict]:
+        """Build index documents carrying the same key fields as indexer documents"""
+        documents = []
+        for i, passage in enumerate(passages):
+            key = encode_storage_path(f"{document_metadata['blob_url']}#passage-{i}")
+            documents.append({
+                AZURE_SEARCH_KEY_FIELD: key,
+                "metadata_storage_path": key,
+                "metadata_storage_name": document_metadata["filename"],
+                "content": passage["text"],
+                **BlobStorageService.index_metadata(document_metadata),
+            })
+        return documents
+
+    @staticmethod
+    async def _embed_passages(document_id: str, passages: List[dict]) -> Optional[np.ndarray]:
+        """Embed passages for the passage index; None (text-only passages) if embedding fails"""
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                None, generate_batch_embeddings, [p["text"] for p in passages]
+            )
+        except Exception as e:
+            logger.warning(f"Indexing passages of {document_id} without vectors: {str(e)[:200]}")
+            return None
+
+    @staticmethod
+    def _passage_index_documents(
+        document_metadata: dict, passages: List[dict], vectors: Optional[np.ndarray]
+    ) -> List[dict]:
+        """Build passage index entries, each referencing its parent document"""
+        documents = []
+        for i, passage in enumerate(passages):
+            entry = {
+                "id": f"{document_metadata['document_id']}-{i}",
+                "passage_index": i,
+                "metadata_storage_name": document_metadata["filename"],
+                "content": passage["text"],
+                **BlobStorageService.index_metadata(document_metadata),
+            }
+            if vectors is not None:
+                entry["content_vector"] = vectors[i].tolist()
+            documents.append(entry)
+        return documents
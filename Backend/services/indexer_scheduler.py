@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set
+
+from config.settings import (
+    INDEXER_DEBOUNCE_SECONDS,
+    INDEXER_POLL_INTERVAL_SECONDS,
+    INDEXER_TRIGGER_MAX_ATTEMPTS,
+)
+from services.ai_search_service import AISearchService
+from services.cosmos_service import CosmosDBService
+
+logger = logging.getLogger(__name__)
+
+
+class IndexerScheduler:
+    """
+    Background scheduler that coalesces indexer triggers
+
+    Uploads only register their document IDs. The scheduler waits for the
+    debounce window to collect a burst, waits out any indexer run that is
+    already in progress, then triggers exactly one run for everything
+    pending and marks those documents as processing in a single update.
+    """
+
+    _pending: Set[str] = set()
+    _wakeup: Optional[asyncio.Event] = None
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls) -> None:
+        """Start the scheduler loop (called on application startup)"""
+        if cls._task is None:
+            cls._wakeup = asyncio.Event()
+            if cls._pending:
+                cls._wakeup.set()
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Stop the scheduler loop (called on application shutdown)"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    def schedule(cls, document_ids: Iterable[str]) -> None:
+        """Queue documents for the next indexer run"""
+        cls._pending.update(document_ids)
+        if cls._wakeup is not None and cls._pending:
+            cls._wakeup.set()
+
+    @classmethod
+    async def _run(cls) -> None:
+        attempts = 0
+        while True:
+            await cls._wakeup.wait()
+            await asyncio.sleep(INDEXER_DEBOUNCE_SECONDS)
+
+            try:
+                # A run in progress may not pick up the new blobs; wait for it
+                # so a single follow-up run covers everything queued meanwhile
+                while AISearchService.is_indexer_running(
+                    await AISearchService.get_indexer_status_async()
+                ):
+                    await asyncio.sleep(INDEXER_POLL_INTERVAL_SECONDS)
+
+                cls._wakeup.clear()
+                document_ids = list(cls._pending)
+                cls._pending.clear()
+                if not document_ids:
+                    continue
+
+                result = await AISearchService.trigger_indexer_async()
+                status = result.get("status")
+
+                if status == "success":
+                    attempts = 0
+                    # Documents already completed by local extraction keep their status
+                    await CosmosDBService.update_documents_async(document_ids, {
+                        "status": "processing",
+                        "indexer_triggered_at": datetime.now(timezone.utc).isoformat()
+                    }, expected_status="uploaded")
+                    logger.info(f"Indexer triggered for {len(document_ids)} document(s)")
+                elif status == "busy":
+                    # A run started after the status check; follow up after it
+                    cls.schedule(document_ids)
+                elif status == "skipped":
+                    logger.info(result.get("message"))
+                    await cls._unschedule(document_ids)
+                else:
+                    attempts += 1
+                    logger.warning(f"Indexer trigger failed (attempt {attempts}): {result.get('message')}")
+                    if attempts < INDEXER_TRIGGER_MAX_ATTEMPTS:
+                        cls.schedule(document_ids)
+                        await asyncio.sleep(INDEXER_POLL_INTERVAL_SECONDS)
+                    else:
+                        attempts = 0
+                        await cls._unschedule(document_ids)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Indexer scheduler error: {str(e)}")
+                await asyncio.sleep(INDEXER_POLL_INTERVAL_SECONDS)
+
+    @staticmethod
+    async def _unschedule(document_ids: List[str]) -> None:
+        """Drop the queued marker of documents no run will be triggered for"""
+        # The reconciler's upload timeout applies to them again
+        await CosmosDBService.update_documents_async(
+            document_ids, {"indexer_scheduled_at": None}, expected_status="uploaded"
+        )
@@ -1,8 +1,10 @@
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+import copy
+import re
 import time
 import logging
 
-import requests
+from config.azure_clients import AzureClients
 from config.settings import (
     AZURE_OPENAI_API_KEY,
     AZURE_OPENAI_API_VERSION,
@@ -11,9 +13,22 @@ from config.settings import (
     AZURE_SEARCH_ENDPOINT,
     AZURE_SEARCH_INDEX_NAME,
     AZURE_SEARCH_KEY,
+    AZURE_SEARCH_PASSAGE_INDEX_NAME,
+    CONTEXT_CHUNK_MAX_TOKENS,
+    CONTEXT_TOKEN_BUDGET,
     OPENAI_API_KEY,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_TTL_SECONDS,
 )
-from openai import AzureOpenAI, OpenAI, RateLimitError
+from openai import AzureOpenAI, BadRequestError, OpenAI, RateLimitError
+from services.ai_search_service import AISearchService
+from services.cosmos_service import CosmosDBService
+from services.document_service import DocumentService
+from utils import odata
+from utils.cache import TTLCache
+from utils.context_packer import pack_context
+from utils.tokens import count_tokens
+from utils.storage_path import decode_storage_path, document_id_from_path
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -37,13 +52,24 @@ except ImportError:
     VECTOR_SEARCH_AVAILABLE = False
     logger.warning("⚠️ Vector search disabled - embedding service not available")
 
+# Retrieval results keyed on (index version, normalized query, scope, mode, top)
+search_cache = TTLCache("search_results", SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS)
+
 
 class QAService:
     """Service for Question & Answer using Azure AI Search and OpenAI"""
 
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Case-fold and collapse whitespace/trailing punctuation so near-identical questions share a cache entry"""
+        return re.sub(r"\s+", " ", query).strip().rstrip("?!.").strip().lower()
+
     @staticmethod
     def search_documents(
-        query: str, document_id: Optional[str] = None, top: int = 5
+        query: str,
+        document_id: Optional[str] = None,
+        top: int = 5,
+        session_id: Optional[str] = None,
     ) -> List[Dict]:
         """
         Search Azure AI Search index for relevant document chunks
@@ -52,29 +78,69 @@ class QAService:
             query: User's question
             document_id: Optional filter by specific document
             top: Number of results to return
+            session_id: Optional session; without a document_id only the
+                session's documents are searched
 
         Returns:
             List of relevant document chunks with scores
         """
-        logger.info(f"🔍 Searching documents - Query: '{query}', Document ID: {document_id}, Top: {top}")
+        logger.info(f"🔍 Searching documents - Query: '{query}', Document ID: {document_id}, Session ID: {session_id}, Top: {top}")
         
         if not all([AZURE_SEARCH_ENDPOINT, AZURE_SEARCH_KEY, AZURE_SEARCH_INDEX_NAME]):
             raise Exception("Azure AI Search not properly configured")
 
+        # Prefer the passage index: results are bounded-size passages
+        # rather than whole extracted documents
+        use_passages = bool(AZURE_SEARCH_PASSAGE_INDEX_NAME)
+        index_name = AZURE_SEARCH_PASSAGE_INDEX_NAME if use_passages else AZURE_SEARCH_INDEX_NAME
+        text_fields = "content" if use_passages else "content,merged_content"
+
         endpoint = AZURE_SEARCH_ENDPOINT.rstrip("/")
-        url = f"{endpoint}/indexes/{AZURE_SEARCH_INDEX_NAME}/docs/search?api-version=2023-11-01"
+        url = f"{endpoint}/indexes/{index_name}/docs/search?api-version=2023-11-01"
+
+        session = AzureClients.get_search_session()
 
-        headers = {"Content-Type": "application/json", "api-key": AZURE_SEARCH_KEY}
+        # Deduplicated uploads are indexed under their source document's ID
+        indexed_document_id = document_id
+        if document_id:
+            document = CosmosDBService.get_document(document_id)
+            if document:
+                indexed_document_id = DocumentService.indexed_document_id(document)
 
         # Build search payload - use actual fields from blob indexer
         # Search in both content and merged_content (merged_content has OCR results)
         payload = {
             "search": query,
-            "searchFields": "content,merged_content",
+            "searchFields": text_fields,
             "top": top,
-            "highlight": "content,merged_content",
+            "highlight": text_fields,
             "count": True,
         }
+        scope = ("all",)
+        if document_id:
+            payload["filter"] = odata.eq("document_id", indexed_document_id)
+            scope = ("document", document_id, indexed_document_id)
+        elif session_id:
+            session_document_ids = CosmosDBService.get_session_indexed_document_ids(session_id)
+            if not session_document_ids:
+                logger.info("📭 Session has no documents to search")
+                return []
+            payload["filter"] = odata.search_in("document_id", session_document_ids)
+            scope = ("session", tuple(session_document_ids))
+
+        # Repeat questions skip both the embedding call and the search
+        cache_key = (
+            AISearchService.index_version(),
+            QAService._normalize_query(query),
+            scope,
+            index_name,
+            "hybrid" if VECTOR_SEARCH_AVAILABLE else "text",
+            top,
+        )
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Search cache hit: {len(cached)} chunks")
+            return copy.deepcopy(cached)
         
         # Try to add vector search if available
         search_type = "text_only"
@@ -100,12 +166,8 @@ class QAService:
         else:
             logger.info("📝 Using text-only search (vector search not configured)")
 
-        # Note: Azure Blob indexer doesn't have a direct document_id field
-        # So we'll search all documents and filter results after retrieval
-        # This is not ideal but works for the current setup
-
         try:
-            response = requests.post(url, headers=headers, json=payload)
+            response = session.post(url, json=payload, timeout=AzureClients.SEARCH_TIMEOUT)
 
             if response.status_code == 200:
                 result = response.json()
@@ -113,24 +175,14 @@ class QAService:
                 # Process results to extract useful information
                 processed_results = []
                 for doc in result.get("value", []):
-                    # Extract document_id from base64 encoded path
-                    import base64
-
-                    encoded_path = doc.get("metadata_storage_path", "")
-                    try:
-                        encoded_path += "=" * (4 - len(encoded_path) % 4)
-                        decoded_path = base64.b64decode(encoded_path).decode("utf-8")
-                        # Extract document_id from path: .../documents/doc_id/filename
-                        if "/documents/" in decoded_path:
-                            extracted_doc_id = decoded_path.split("/documents/")[
-                                1
-                            ].split("/")[0]
-                        else:
-                            extracted_doc_id = "unknown"
-                    except:
-                        extracted_doc_id = "unknown"
-                        print("Merged Content ", doc.get("Merged content", ""))
-                        print("Content ", doc.get("content", ""))
+                    # Blobs indexed before the document_id field existed only
+                    # carry it in the storage path: .../documents/doc_id/filename
+                    decoded_path = decode_storage_path(doc.get("metadata_storage_path", ""))
+                    extracted_doc_id = (
+                        doc.get("document_id")
+                        or document_id_from_path(decoded_path)
+                        or "unknown"
+                    )
                     processed_results.append(
                         {
                             "document_id": extracted_doc_id,
@@ -138,38 +190,20 @@ class QAService:
                             or doc.get("content", ""),
                             "text": doc.get("merged_content") or doc.get("content", ""),
                             "merged_content": doc.get("merged_content", ""),
-                            "metadata_storage_path": decoded_path
-                            if "decoded_path" in locals()
-                            else "",
+                            "metadata_storage_path": decoded_path,
                             "@search.score": doc.get("@search.score", 0),
                             "@search.highlights": doc.get("@search.highlights", {}),
                         }
                     )
+                    if use_passages:
+                        processed_results[-1]["passage_index"] = doc.get("passage_index")
+                        processed_results[-1]["filename"] = doc.get("metadata_storage_name")
 
-                # Filter by document_id if specified (post-filter since Azure Blob indexer doesn't have this field)
+                # Deduplicated uploads share the source document's blob; report
+                # results under the document ID the caller asked about
                 if document_id:
-                    before_filter = len(processed_results)
-                    processed_results = [
-                        r for r in processed_results if r["document_id"] == document_id
-                    ]
-                    logger.info(f"📄 Filtered by document_id: {before_filter} → {len(processed_results)} results")
-                    
-                    # If no results, try wildcard search for this document
-                    if len(processed_results) == 0:
-                        logger.info("⚠️ No results found, trying wildcard search")
-                        payload["search"] = "*"
-                        payload["top"] = 20
-                        resp2 = requests.post(url, headers=headers, json=payload)
-                        if resp2.status_code == 200:
-                            for doc in resp2.json().get("value", []):
-                                path = doc.get("metadata_storage_path", "")
-                                if document_id in base64.b64decode(path + "=" * (4 - len(path) % 4)).decode("utf-8", errors="ignore"):
-                                    processed_results.append({
-                                        "document_id": document_id,
-                                        "content": doc.get("merged_content") or doc.get("content", ""),
-                                        "text": doc.get("merged_content") or doc.get("content", ""),
-                                        "@search.score": 1.0,
-                                    })
+                    for result in processed_results:
+                        result["document_id"] = document_id
 
                 logger.info(f"✅ Search completed ({search_type}): Found {len(processed_results)} relevant chunks")
                 for i, result in enumerate(processed_results[:2], 1):  # Log first 2 results
@@ -180,6 +214,11 @@ class QAService:
                 for result in processed_results:
                     result["_search_type"] = search_type
 
+                # A text-only fallback is not what the hybrid key promises, and
+                # an empty result may only mean the documents are not indexed yet
+                if processed_results and search_type != "text_only_fallback":
+                    search_cache.set(cache_key, copy.deepcopy(processed_results))
+
                 return processed_results
             else:
                 raise Exception(
@@ -190,20 +229,14 @@ class QAService:
             raise Exception(f"Error searching documents: {str(e)}")
 
     @staticmethod
-    def generate_answer(question: str, context_chunks: List[Dict]) -> Dict:
+    def _prepare_prompt(question: str, context_chunks: List[Dict]) -> Optional[Dict]:
         """
-        Generate answer using Azure OpenAI GPT with retrieved context
-
-        Args:
-            question: User's question
-            context_chunks: Relevant chunks from search
+        Pack the context and build the prompt
 
         Returns:
-            Dict with answer and citations
+            Dict with use_azure, chunks (packed), context, system_prompt and
+            combined_prompt; None if there is no context to answer from
         """
-        logger.info(f"🤖 Generating answer for question: '{question}'")
-        logger.info(f"📚 Using {len(context_chunks)} context chunks")
-        
         # Check if using Azure OpenAI or regular OpenAI
         use_azure = all(
             [AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_KEY, AZURE_OPENAI_DEPLOYMENT_NAME]
@@ -212,21 +245,28 @@ class QAService:
         if not use_azure and not OPENAI_API_KEY:
             raise Exception("Neither Azure OpenAI nor OpenAI API key configured")
 
+        # Keep the best, distinct chunks within the token budget
+        model = AZURE_OPENAI_DEPLOYMENT_NAME if use_azure else "gpt-4"
+        retrieved = len(context_chunks)
+        context_chunks, context_tokens = pack_context(
+            context_chunks, CONTEXT_TOKEN_BUDGET, CONTEXT_CHUNK_MAX_TOKENS, model
+        )
+        logger.info(
+            f"📦 Packed {len(context_chunks)}/{retrieved} chunks into {context_tokens} tokens "
+            f"(budget {CONTEXT_TOKEN_BUDGET})"
+        )
+
         # Build context from chunks
         context = "\n\n".join(
             [
-                f"[Document {i + 1}] {chunk.get('merged_content') or chunk.get('content', chunk.get('text', ''))}"
+                f"[Document {i + 1}] {chunk['content']}"
                 for i, chunk in enumerate(context_chunks)
             ]
         )
 
         if not context:
             logger.warning("⚠️ No context available to generate answer")
-            return {
-                "answer": "I couldn't find relevant information in the uploaded documents to answer your question.",
-                "citations": [],
-                "confidence": "low",
-            }
+            return None
         
         # Log context preview
         context_preview = context[:500] + "..." if len(context) > 500 else context
@@ -253,20 +293,111 @@ Question: {question}
 
 Please provide a clear answer based on the context above."""
 
+        return {
+            "use_azure": use_azure,
+            "chunks": context_chunks,
+            "context": context,
+            "system_prompt": system_prompt,
+            "combined_prompt": combined_prompt,
+        }
+
+    @staticmethod
+    def _chat_client(use_azure: bool):
+        """Chat completions client (retries are handled by the callers)"""
+        if use_azure:
+            return AzureOpenAI(
+                api_key=AZURE_OPENAI_API_KEY,
+                api_version=AZURE_OPENAI_API_VERSION,
+                azure_endpoint=AZURE_OPENAI_ENDPOINT,
+                timeout=20.0,  # Reduced from 30 to 20 seconds
+                max_retries=0,  # Disable automatic retries, we'll handle manually
+            )
+        return OpenAI(
+            api_key=OPENAI_API_KEY,
+            timeout=20.0,
+            max_retries=0
+        )
+
+    @staticmethod
+    def _chat_params(prompt: Dict, question: str) -> Dict:
+        """Chat completion parameters for a prepared prompt"""
+        if prompt["use_azure"]:
+            # Optimized parameters for document Q&A
+            return {
+                "model": AZURE_OPENAI_DEPLOYMENT_NAME,
+                "messages": [{"role": "user", "content": prompt["combined_prompt"]}],
+                "temperature": 0.3,  # Low temperature for factual, consistent answers
+                "max_tokens": 1200,  # Sufficient for detailed responses
+                "top_p": 0.95,  # High-quality token selection
+                "frequency_penalty": 0.3,  # Reduce repetition
+                "presence_penalty": 0.1,  # Encourage focused answers
+            }
+        return {
+            "model": "gpt-4",
+            "messages": [
+                {"role": "system", "content": prompt["system_prompt"]},
+                {"role": "user", "content": f"Context:\n{prompt['context']}\n\nQuestion: {question}"},
+            ],
+            "temperature": 0.3,
+            "max_tokens": 500,
+        }
+
+    @staticmethod
+    def _citations(context_chunks: List[Dict]) -> List[Dict]:
+        """Extract citations (document IDs mentioned in chunks)"""
+        citations = []
+        for i, chunk in enumerate(context_chunks, 1):
+            # Get document ID from chunk
+            doc_id = chunk.get("document_id", "unknown")
+            content = chunk.get("content", chunk.get("text", ""))
+
+            # Truncate content for citation
+            citation_text = content[:300] + "..." if len(content) > 300 else content
+
+            citations.append(
+                {
+                    "document_id": doc_id,
+                    "source": f"Document {i}",
+                    "text": citation_text,
+                    "score": chunk.get("@search.score", 0),
+                }
+            )
+        return citations
+
+    @staticmethod
+    def generate_answer(question: str, context_chunks: List[Dict]) -> Dict:
+        """
+        Generate answer using Azure OpenAI GPT with retrieved context
+
+        Args:
+            question: User's question
+            context_chunks: Relevant chunks from search
+
+        Returns:
+            Dict with answer and citations
+        """
+        logger.info(f"🤖 Generating answer for question: '{question}'")
+        logger.info(f"📚 Using {len(context_chunks)} context chunks")
+        
+        prompt = QAService._prepare_prompt(question, context_chunks)
+        if prompt is None:
+            return {
+                "answer": "I couldn't find relevant information in the uploaded documents to answer your question.",
+                "citations": [],
+                "confidence": "low",
+            }
+        use_azure = prompt["use_azure"]
+        context_chunks = prompt["chunks"]
+        combined_prompt = prompt["combined_prompt"]
+
         # Log the full prompt being sent
         logger.info(f"📤 Sending prompt to OpenAI (length: {len(combined_prompt)} chars)")
         logger.info(f"💬 Full prompt:\n{'='*60}\n{combined_prompt}\n{'='*60}")
 
         try:
             # Use Azure OpenAI if configured, otherwise use regular OpenAI
+            client = QAService._chat_client(use_azure)
             if use_azure:
-                client = AzureOpenAI(
-                    api_key=AZURE_OPENAI_API_KEY,
-                    api_version=AZURE_OPENAI_API_VERSION,
-                    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-                    timeout=20.0,  # Reduced from 30 to 20 seconds
-                    max_retries=0,  # Disable automatic retries, we'll handle manually
-                )
                 
                 # Retry logic for rate limits
                 max_retries = 2  # Allow 2 retries for better reliability
@@ -277,15 +408,8 @@ Please provide a clear answer based on the context above."""
                         logger.info(f"🚀 Calling Azure OpenAI API (attempt {attempt + 1}/{max_retries})")
                         logger.info(f"   Model: {AZURE_OPENAI_DEPLOYMENT_NAME}")
                         
-                        # Optimized parameters for document Q&A
                         response = client.chat.completions.create(
-                            model=AZURE_OPENAI_DEPLOYMENT_NAME,
-                            messages=[{"role": "user", "content": combined_prompt}],
-                            temperature=0.3,  # Low temperature for factual, consistent answers
-                            max_tokens=1200,  # Sufficient for detailed responses
-                            top_p=0.95,  # High-quality token selection
-                            frequency_penalty=0.3,  # Reduce repetition
-                            presence_penalty=0.1,  # Encourage focused answers
+                            **QAService._chat_params(prompt, question)
                         )
                         
                         logger.info(f"✅ Received response from OpenAI")
@@ -322,41 +446,13 @@ Please provide a clear answer based on the context above."""
                         # Re-raise other exceptions
                         raise
             else:
-                client = OpenAI(
-                    api_key=OPENAI_API_KEY,
-                    timeout=20.0,
-                    max_retries=0
-                )
                 response = client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {question}"},
-                    ],
-                    temperature=0.3,
-                    max_tokens=500,
+                    **QAService._chat_params(prompt, question)
                 )
 
             answer = response.choices[0].message.content
 
-            # Extract citations (document IDs mentioned in chunks)
-            citations = []
-            for i, chunk in enumerate(context_chunks, 1):
-                # Get document ID from chunk
-                doc_id = chunk.get("document_id", "unknown")
-                content = chunk.get("content", chunk.get("text", ""))
-
-                # Truncate content for citation
-                citation_text = content[:300] + "..." if len(content) > 300 else content
-
-                citations.append(
-                    {
-                        "document_id": doc_id,
-                        "source": f"Document {i}",
-                        "text": citation_text,
-                        "score": chunk.get("@search.score", 0),
-                    }
-                )
+            citations = QAService._citations(context_chunks)
 
             logger.info(f"📋 Generated {len(citations)} citations")
             
@@ -382,7 +478,7 @@ Please provide a clear answer based on the context above."""
         Args:
             question: User's question
             document_id: Optional filter by specific document
-            session_id: Optional session ID for tracking
+            session_id: Optional session ID; restricts retrieval to the session's documents
 
         Returns:
             Dict with answer, citations, and metadata
@@ -396,7 +492,9 @@ Please provide a clear answer based on the context above."""
         
         try:
             # Step 1: Search for relevant chunks
-            search_results = QAService.search_documents(question, document_id, top=5)
+            search_results = QAService.search_documents(
+                question, document_id, top=5, session_id=session_id
+            )
 
             if not search_results:
                 return {
@@ -431,3 +529,139 @@ Please provide a clear answer based on the context above."""
                 "error": str(e),
                 "status": "error",
             }
+
+    @staticmethod
+    def stream_answer(
+        question: str,
+        document_id: Optional[str] = None,
+        session_id: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        Q&A pipeline that yields events as soon as each stage has output
+
+        Events (dicts with "event" and "data"):
+            retrieval: chunks found, search type and retrieval time
+            citations: citations for the packed context
+            token: a piece of the answer text
+            done: token usage (estimated if the API does not report it) and timings
+            error: the pipeline failed; no further events follow
+
+        Args:
+            question: User's question
+            document_id: Optional filter by specific document
+            session_id: Optional session ID; restricts retrieval to the session's documents
+        """
+        started = time.monotonic()
+
+        def elapsed_ms(since: float) -> int:
+            return int((time.monotonic() - since) * 1000)
+
+        try:
+            search_results = QAService.search_documents(
+                question, document_id, top=5, session_id=session_id
+            )
+        except Exception as e:
+            yield {"event": "error", "data": {"error": str(e)}}
+            return
+        retrieval_ms = elapsed_ms(started)
+        search_type = search_results[0].get("_search_type", "text_only") if search_results else "none"
+        yield {"event": "retrieval", "data": {
+            "chunks_found": len(search_results),
+            "search_type": search_type,
+            "retrieval_ms": retrieval_ms,
+        }}
+
+        try:
+            prompt = QAService._prepare_prompt(question, search_results) if search_results else None
+            citations = QAService._citations(prompt["chunks"]) if prompt else []
+        except Exception as e:
+            logger.error(f"❌ Error preparing answer context: {str(e)[:300]}")
+            yield {"event": "error", "data": {"error": str(e)}}
+            return
+        if prompt is None:
+            yield {"event": "citations", "data": {"citations": [], "confidence": "none"}}
+            yield {"event": "token", "data": {"text": "No relevant information found in the uploaded documents."}}
+            yield {"event": "done", "data": {
+                "usage": None,
+                "timings": {"retrieval_ms": retrieval_ms, "total_ms": elapsed_ms(started)},
+            }}
+            return
+
+        yield {"event": "citations", "data": {
+            "citations": citations,
+            "confidence": "high",
+        }}
+
+        generation_started = time.monotonic()
+        try:
+            params = QAService._chat_params(prompt, question)
+            client = QAService._chat_client(prompt["use_azure"])
+            try:
+                stream = client.chat.completions.create(
+                    **params, stream=True, stream_options={"include_usage": True}
+                )
+            except BadRequestError as e:
+                # Older API versions reject stream_options; usage is estimated instead
+                if "stream_options" not in str(e):
+                    raise
+                stream = client.chat.completions.create(**params, stream=True)
+        except RateLimitError as e:
+            logger.error(f"⚠️ Rate limit error: {str(e)[:200]}")
+            yield {"event": "error", "data": {
+                "error": "rate_limit",
+                "message": "I'm currently experiencing high demand. Please try again in a minute.",
+            }}
+            return
+        except Exception as e:
+            logger.error(f"❌ Error calling OpenAI: {str(e)[:300]}")
+            yield {"event": "error", "data": {"error": str(e)}}
+            return
+
+        answer_parts = []
+        usage = None
+        finish_reason = None
+        first_token_ms = None
+        try:
+            for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage.model_dump()
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                finish_reason = choice.finish_reason or finish_reason
+                text = choice.delta.content if choice.delta else None
+                if text:
+                    if first_token_ms is None:
+                        first_token_ms = elapsed_ms(started)
+                        logger.info(f"⚡ First answer token after {first_token_ms} ms")
+                    answer_parts.append(text)
+                    yield {"event": "token", "data": {"text": text}}
+        except Exception as e:
+            logger.error(f"❌ Error streaming answer: {str(e)[:300]}")
+            yield {"event": "error", "data": {"error": str(e)}}
+            return
+        finally:
+            stream.close()
+
+        if usage is None:
+            prompt_tokens = sum(count_tokens(m["content"], params["model"]) for m in params["messages"])
+            completion_tokens = count_tokens("".join(answer_parts), params["model"])
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "estimated": True,
+            }
+
+        timings = {
+            "retrieval_ms": retrieval_ms,
+            "time_to_first_token_ms": first_token_ms,
+            "generation_ms": elapsed_ms(generation_started),
+            "total_ms": elapsed_ms(started),
+        }
+        logger.info(f"✅ Streamed answer: {usage.get('total_tokens')} tokens, timings {timings}")
+        yield {"event": "done", "data": {
+            "usage": usage,
+            "finish_reason": finish_reason,
+            "timings": timings,
+        }}
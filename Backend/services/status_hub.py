@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+from config.settings import STATUS_STREAM_INTERVAL_SECONDS
+from services.cosmos_service import CosmosDBService
+
+logger = logging.getLogger(__name__)
+
+
+class _SessionWatch:
+    """Subscribers and last known statuses of one session"""
+
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.snapshot: Optional[Dict[str, dict]] = None
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class StatusHub:
+    """
+    Fan-out of document status changes to server-sent event streams
+
+    Each watched session has one watcher task that re-reads the session's
+    statuses every STATUS_STREAM_INTERVAL_SECONDS (or sooner when the
+    StatusReconciler reports a change) and pushes only the changed
+    documents to every subscriber. N clients watching the same session
+    cost one read per interval, not N.
+    """
+
+    _sessions: Dict[str, _SessionWatch] = {}
+    _queue_size = 100
+
+    @classmethod
+    def subscribe(cls, session_id: str) -> asyncio.Queue:
+        """Register a subscriber; its queue first receives a snapshot event"""
+        watch = cls._sessions.get(session_id)
+        if watch is None:
+            watch = cls._sessions[session_id] = _SessionWatch()
+            watch.task = asyncio.create_task(cls._watch(session_id, watch))
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=cls._queue_size)
+        watch.subscribers.add(queue)
+        if watch.snapshot is not None:
+            queue.put_nowait(cls._snapshot_event(watch.snapshot))
+        return queue
+
+    @classmethod
+    def unsubscribe(cls, session_id: str, queue: asyncio.Queue) -> None:
+        """Remove a subscriber; the watcher stops with the last one"""
+        watch = cls._sessions.get(session_id)
+        if watch is None:
+            return
+        watch.subscribers.discard(queue)
+        if not watch.subscribers:
+            watch.task.cancel()
+            del cls._sessions[session_id]
+
+    @classmethod
+    def notify(cls, session_ids: Iterable[str]) -> None:
+        """Re-read the given sessions now instead of at the next interval"""
+        for session_id in session_ids:
+            watch = cls._sessions.get(session_id)
+            if watch is not None:
+                watch.wakeup.set()
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Stop all watchers (called on application shutdown)"""
+        tasks = [watch.task for watch in cls._sessions.values()]
+        cls._sessions.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    @classmethod
+    async def _watch(cls, session_id: str, watch: _SessionWatch) -> None:
+        while True:
+            try:
+                documents = await CosmosDBService.list_session_statuses_async(session_id)
+                current = {d["document_id"]: d for d in documents}
+
+                if watch.snapshot is None:
+                    event = cls._snapshot_event(current)
+                else:
+                    changed = [d for key, d in current.items() if watch.snapshot.get(key) != d]
+                    event = {"type": "update", "data": {"documents": changed}} if changed else None
+
+                watch.snapshot = current
+                if event:
+                    cls._publish(watch, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Status watch failed for session {session_id}: {str(e)}")
+
+            try:
+                await asyncio.wait_for(watch.wakeup.wait(), STATUS_STREAM_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            watch.wakeup.clear()
+
+    @classmethod
+    def _publish(cls, watch: _SessionWatch, event: dict) -> None:
+        for queue in list(watch.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop its backlog and resync it with a snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(cls._snapshot_event(watch.snapshot))
+
+    @staticmethod
+    def _snapshot_event(snapshot: Dict[str, dict]) -> dict:
+        documents: List[dict] = list(snapshot.values())
+        return {"type": "snapshot", "data": {"documents": documents}}
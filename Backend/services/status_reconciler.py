@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from config.settings import (
+    STATUS_FAILED_RECHECK_HOURS,
+    STATUS_RECONCILE_BATCH_SIZE,
+    STATUS_RECONCILE_INTERVAL_SECONDS,
+)
+from services.ai_search_service import AISearchService
+from services.cosmos_service import CosmosDBService
+from services.document_service import DocumentService
+from services.status_hub import StatusHub
+
+logger = logging.getLogger(__name__)
+
+
+class StatusReconciler:
+    """
+    Background worker that advances document statuses
+
+    Periodically loads documents that are not in a terminal state (and
+    recently failed ones, which a later indexer run may still index), checks
+    them against the search index and the indexer status in bulk, and
+    writes all transitions with one bulk_write. Read endpoints only read
+    the stored status.
+    """
+
+    _task: Optional[asyncio.Task] = None
+    # Latest completed_at seen in Cosmos DB; a newer one means some worker
+    # completed a document and this worker's search cache is stale
+    _last_completed_at: Optional[str] = None
+
+    @classmethod
+    def start(cls) -> None:
+        """Start the reconciler loop (called on application startup)"""
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls._run())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """Stop the reconciler loop (called on application shutdown)"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            try:
+                await cls.reconcile_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Status reconciliation failed: {str(e)}")
+            await asyncio.sleep(STATUS_RECONCILE_INTERVAL_SECONDS)
+
+    @classmethod
+    async def reconcile_once(cls) -> int:
+        """
+        Run one reconciliation pass
+
+        Returns:
+            Number of documents whose status changed
+        """
+        await cls._sync_index_version()
+
+        now = datetime.now(timezone.utc)
+        documents = await CosmosDBService.list_pending_documents_async(STATUS_RECONCILE_BATCH_SIZE)
+        # Recently failed documents fill the rest of the batch; they are only
+        # completed if a later indexer run indexed them after all
+        if len(documents) < STATUS_RECONCILE_BATCH_SIZE:
+            documents += await CosmosDBService.list_failed_documents_async(
+                STATUS_RECONCILE_BATCH_SIZE - len(documents),
+                (now - timedelta(hours=STATUS_FAILED_RECHECK_HOURS)).isoformat(),
+            )
+        if not documents:
+            return 0
+
+        indexed_ids, indexer_status = await asyncio.gather(
+            AISearchService.get_indexed_document_ids_async(
+                [DocumentService.indexed_document_id(d) for d in documents]
+            ),
+            AISearchService.get_indexer_status_async(),
+        )
+
+        updates = DocumentService.status_updates(
+            documents, indexed_ids, now, indexer_status
+        )
+        if not updates:
+            return 0
+
+        # Only apply a transition if no one else moved the document meanwhile
+        expected_status = {d["document_id"]: d["status"] for d in documents}
+        modified = await CosmosDBService.bulk_update_documents_async(updates, expected_status)
+        logger.info(f"Reconciled {modified} document status(es)")
+        # Every worker computes the same transitions but only one wins each
+        # write; all of them must drop their cached search results
+        AISearchService.bump_index_version()
+
+        StatusHub.notify({d.get("session_id") for d in documents if d["document_id"] in updates})
+        return modified
+
+    @classmethod
+    async def _sync_index_version(cls) -> None:
+        """Bump the index version if a document was completed since the last pass"""
+        latest = await CosmosDBService.latest_completed_at_async()
+        if latest != cls._last_completed_at:
+            cls._last_completed_at = latest
+            AISearchService.bump_index_version()
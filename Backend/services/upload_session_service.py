@@ -0,0 +1,206 @@
+import math
+import uuid
+from datetime import datetime, timezone
+from fastapi import HTTPException
+from config.settings import RESUMABLE_CHUNK_MAX_SIZE
+from services.blob_service import BlobStorageService
+from services.cosmos_service import CosmosDBService
+from services.document_service import DocumentService
+
+# Azure Blob Storage commits at most this many blocks per blob
+MAX_BLOCKS_PER_BLOB = 50000
+
+
+class UploadSessionService:
+    """
+    Resumable uploads: create a session, PUT chunks at increasing offsets,
+    query the current offset after a failure, then finalize.
+
+    Every chunk is staged as an uncommitted blob block and the session
+    record in Cosmos DB tracks the committed offset and block list, so a
+    client only resends the bytes after the last acknowledged offset.
+    """
+
+    @staticmethod
+    def _block_id(offset: int) -> str:
+        # Block IDs must all have the same length within a blob
+        return f"{offset:012d}"
+
+    @staticmethod
+    def _min_chunk_size(total_size: int) -> int:
+        """Smallest non-final chunk that keeps the blob within the block limit"""
+        return math.ceil(total_size / MAX_BLOCKS_PER_BLOB)
+
+    @staticmethod
+    def session_status(upload_session: dict) -> dict:
+        """Public view of an upload session"""
+        return {
+            "upload_id": upload_session["upload_id"],
+            "document_id": upload_session["document_id"],
+            "filename": upload_session["filename"],
+            "size": upload_session["total_size"],
+            "offset": upload_session["offset"],
+            "status": upload_session["status"],
+            "min_chunk_size": UploadSessionService._min_chunk_size(upload_session["total_size"]),
+            "max_chunk_size": RESUMABLE_CHUNK_MAX_SIZE,
+        }
+
+    @staticmethod
+    async def create_session(filename: str, total_size: int, session_id: str) -> dict:
+        """Validate the announced file and open a resumable upload session"""
+        file_ext = DocumentService.validate_filename(filename)
+
+        if total_size <= 0:
+            raise HTTPException(status_code=400, detail="File is empty")
+        DocumentService.validate_file_size(total_size)
+
+        document_id = str(uuid.uuid4())
+        now = datetime.now(timezone.utc).isoformat()
+        upload_session = {
+            "upload_id": str(uuid.uuid4()),
+            "document_id": document_id,
+            "session_id": session_id,
+            "filename": filename,
+            "file_type": file_ext,
+            "blob_name": f"{document_id}/{filename}",
+            "total_size": total_size,
+            "offset": 0,
+            "block_ids": [],
+            "status": "in_progress",
+            "created_at": now,
+            "updated_at": now,
+        }
+        await CosmosDBService.create_upload_session_async(upload_session)
+        return UploadSessionService.session_status(upload_session)
+
+    @staticmethod
+    async def get_session(upload_id: str, session_id: str) -> dict:
+        """Get an upload session owned by the caller's session"""
+        upload_session = await CosmosDBService.get_upload_session_async(upload_id)
+
+        if not upload_session:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+
+        if upload_session.get("session_id") != session_id:
+            raise HTTPException(status_code=403, detail="Access denied to this upload session")
+
+        return upload_session
+
+    @staticmethod
+    async def upload_chunk(upload_id: str, session_id: str, offset: int, data: bytes) -> dict:
+        """Stage one chunk at `offset`; the offset must match the session's current offset"""
+        upload_session = await UploadSessionService.get_session(upload_id, session_id)
+
+        if upload_session["status"] != "in_progress":
+            raise HTTPException(status_code=409, detail=f"Upload session is {upload_session['status']}")
+
+        current_offset = upload_session["offset"]
+        if offset != current_offset:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Offset mismatch: expected {current_offset}, got {offset}",
+                headers={"Upload-Offset": str(current_offset)},
+            )
+
+        if not data:
+            raise HTTPException(status_code=400, detail="Chunk is empty")
+
+        new_offset = offset + len(data)
+        if new_offset > upload_session["total_size"]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Chunk exceeds announced file size of {upload_session['total_size']} bytes",
+            )
+
+        # Every chunk is one block; only the last one may be smaller
+        min_chunk_size = UploadSessionService._min_chunk_size(upload_session["total_size"])
+        if new_offset < upload_session["total_size"] and len(data) < min_chunk_size:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Chunk is smaller than the minimum of {min_chunk_size} bytes",
+            )
+
+        block_id = UploadSessionService._block_id(offset)
+        await BlobStorageService.stage_block(upload_session["blob_name"], block_id, data)
+
+        # Conditional on the offset so concurrent retries cannot both advance it
+        updated = await CosmosDBService.advance_upload_session_async(
+            upload_id, offset, new_offset, block_id, datetime.now(timezone.utc).isoformat()
+        )
+        if not updated:
+            latest = await UploadSessionService.get_session(upload_id, session_id)
+            raise HTTPException(
+                status_code=409,
+                detail=f"Offset mismatch: expected {latest['offset']}, got {offset}",
+                headers={"Upload-Offset": str(latest["offset"])},
+            )
+
+        return UploadSessionService.session_status(updated)
+
+    @staticmethod
+    async def complete_session(upload_id: str, session_id: str) -> dict:
+        """Commit all staged chunks and hand the document to the regular upload flow"""
+        upload_session = await UploadSessionService.get_session(upload_id, session_id)
+
+        if upload_session["status"] != "in_progress":
+            raise HTTPException(status_code=409, detail=f"Upload session is {upload_session['status']}")
+
+        if upload_session["offset"] != upload_session["total_size"]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete: received {upload_session['offset']} of {upload_session['total_size']} bytes",
+                headers={"Upload-Offset": str(upload_session["offset"])},
+            )
+
+        # Claim the session so concurrent finalize calls cannot both register it
+        claimed = await CosmosDBService.update_upload_session_async(
+            upload_id,
+            {"status": "finalizing", "updated_at": datetime.now(timezone.utc).isoformat()},
+            expected_status="in_progress",
+        )
+        if not claimed:
+            raise HTTPException(status_code=409, detail="Upload session is already being finalized")
+
+        try:
+            document_id = upload_session["document_id"]
+            document_metadata = {
+                "id": document_id,
+                "document_id": document_id,
+                "session_id": session_id,
+                "filename": upload_session["filename"],
+                "blob_name": upload_session["blob_name"],
+                "file_size": upload_session["total_size"],
+                "file_type": upload_session["file_type"],
+                "status": "uploaded",
+                "upload_date": datetime.now(timezone.utc).isoformat(),
+                "processed": False,
+            }
+            document_metadata["blob_url"] = await BlobStorageService.commit_blocks(
+                upload_session["blob_name"],
+                upload_session["block_ids"],
+                BlobStorageService.index_metadata(document_metadata),
+            )
+
+            # Chunks may have been received by different workers, so the
+            # content is hashed once it is committed
+            document_metadata["content_hash"] = await BlobStorageService.hash_file_async(
+                upload_session["blob_name"]
+            )
+            duplicate = await DocumentService.use_existing_copy(document_metadata)
+
+            result = await DocumentService.register_document(document_metadata)
+        except Exception:
+            # Staged blocks are kept, so finalizing can simply be retried
+            await CosmosDBService.update_upload_session_async(upload_id, {"status": "in_progress"})
+            raise
+
+        await CosmosDBService.update_upload_session_async(upload_id, {
+            "status": "completed",
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+        # The document now refers to the existing copy; drop the redundant blob
+        if duplicate:
+            await BlobStorageService.delete_file_async(upload_session["blob_name"])
+
+        return result
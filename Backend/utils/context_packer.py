@@ -0,0 +1,113 @@
+"""
+Token-budgeted packing of retrieved chunks into a prompt context
+"""
+import re
+from typing import Dict, List, Optional, Tuple
+
+from utils.tokens import CHARS_PER_TOKEN, count_tokens, truncate_tokens
+
+# Chunks sharing at least this fraction of their word shingles are duplicates
+DUPLICATE_SIMILARITY = 0.8
+
+# Remaining budget below which no further (trimmed) chunk is added
+MIN_CHUNK_TOKENS = 50
+
+_HIGHLIGHT_TAGS = re.compile(r"</?em>")
+
+
+def _chunk_text(chunk: Dict) -> str:
+    return chunk.get("merged_content") or chunk.get("content") or chunk.get("text") or ""
+
+
+def _shingles(text: str, size: int = 5) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _is_duplicate(shingles: set, seen: List[set]) -> bool:
+    for other in seen:
+        smaller = min(len(shingles), len(other))
+        if smaller and len(shingles & other) / smaller >= DUPLICATE_SIMILARITY:
+            return True
+    return False
+
+
+def _highlight_offset(text: str, highlights: Dict[str, List[str]]) -> int:
+    """Character offset of the first highlight fragment found in text (0 if none)"""
+    for fragments in highlights.values():
+        for fragment in fragments or []:
+            position = text.find(_HIGHLIGHT_TAGS.sub("", fragment).strip())
+            if position >= 0:
+                return position
+    return 0
+
+
+def trim_around_highlights(
+    text: str, highlights: Dict[str, List[str]], max_tokens: int, model: Optional[str] = None
+) -> str:
+    """Keep a window of about max_tokens tokens centred on the first search highlight"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    window = max_tokens * CHARS_PER_TOKEN
+    start = max(0, _highlight_offset(text, highlights) - window // 2)
+    start = min(start, max(0, len(text) - window))
+    if start:
+        # Start on a word boundary
+        space = text.find(" ", start)
+        start = space + 1 if 0 <= space < start + 100 else start
+    return truncate_tokens(text[start:start + window], max_tokens, model)
+
+
+def pack_context(
+    chunks: List[Dict],
+    token_budget: int,
+    chunk_max_tokens: int,
+    model: Optional[str] = None,
+) -> Tuple[List[Dict], int]:
+    """
+    Select and trim chunks so their text fits a token budget
+
+    Chunks are taken best @search.score first; near-duplicates of an
+    already selected chunk are dropped, each chunk is trimmed to
+    chunk_max_tokens around its highlights, and the last chunk is cut to
+    whatever budget remains.
+
+    Args:
+        chunks: Search results
+        token_budget: Total tokens allowed for all chunk texts
+        chunk_max_tokens: Tokens allowed per chunk
+        model: Model (or deployment) name used to pick the tokenizer
+
+    Returns:
+        Tuple of (packed chunks, each a copy whose "content" is the trimmed
+        text; total tokens of their texts)
+    """
+    ranked = sorted(chunks, key=lambda c: c.get("@search.score", 0) or 0, reverse=True)
+
+    packed = []
+    seen = []
+    total = 0
+    for chunk in ranked:
+        remaining = token_budget - total
+        if remaining < MIN_CHUNK_TOKENS:
+            break
+
+        text = _chunk_text(chunk).strip()
+        if not text:
+            continue
+        shingles = _shingles(text)
+        if _is_duplicate(shingles, seen):
+            continue
+
+        text = trim_around_highlights(
+            text, chunk.get("@search.highlights") or {}, min(chunk_max_tokens, remaining), model
+        )
+        tokens = count_tokens(text, model)
+
+        seen.append(shingles)
+        packed.append({**chunk, "content": text, "text": text, "merged_content": ""})
+        total += tokens
+
+    return packed, total
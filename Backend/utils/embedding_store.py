@@ -0,0 +1,117 @@
+"""
+Memory-mapped on-disk store of embedding vectors
+
+A fixed-capacity, open-addressed hash table in a single file per vector
+dimension. Every uvicorn worker maps the same file, so a vector written by
+one worker is readable by all and survives restarts. Each slot holds the
+key digest, a checksum and the float32 vector; a slot whose checksum does
+not match (e.g. two workers racing on it) simply reads as a miss.
+"""
+import os
+import threading
+import zlib
+from typing import Dict, Optional
+
+import numpy as np
+
+DIGEST_SIZE = 32  # sha256
+PROBE_LIMIT = 8
+
+
+class EmbeddingStore:
+    """Disk tier of the embedding cache, keyed by 32-byte digests"""
+
+    def __init__(self, directory: str, slots: int):
+        self.directory = directory
+        self.slots = slots
+        self._tables: Dict[int, np.memmap] = {}
+        self._lock = threading.Lock()
+
+    def _slot_dtype(self, dimensions: int) -> np.dtype:
+        return np.dtype([
+            ("digest", np.uint8, DIGEST_SIZE),
+            ("checksum", np.uint32),
+            ("vector", np.float32, dimensions),
+        ])
+
+    def _table(self, dimensions: int, create: bool) -> Optional[np.memmap]:
+        table = self._tables.get(dimensions)
+        if table is not None:
+            return table
+        path = os.path.join(self.directory, f"embeddings-{dimensions}.bin")
+        with self._lock:
+            table = self._tables.get(dimensions)
+            if table is not None:
+                return table
+            dtype = self._slot_dtype(dimensions)
+            if not os.path.exists(path):
+                if not create:
+                    return None
+                os.makedirs(self.directory, exist_ok=True)
+                # Sparse file; pages are only allocated once written
+                with open(path, "ab") as f:
+                    f.truncate(dtype.itemsize * self.slots)
+            slots = os.path.getsize(path) // dtype.itemsize
+            table = np.memmap(path, dtype=dtype, mode="r+", shape=(slots,))
+            self._tables[dimensions] = table
+            return table
+
+    @staticmethod
+    def _checksum(digest: bytes, vector: np.ndarray) -> int:
+        return zlib.crc32(vector.tobytes(), zlib.crc32(digest)) or 1
+
+    def _probe(self, table: np.memmap, digest: bytes):
+        home = int.from_bytes(digest[:8], "little") % len(table)
+        for i in range(PROBE_LIMIT):
+            yield (home + i) % len(table)
+
+    def get(self, digest: bytes, dimensions: int) -> Optional[np.ndarray]:
+        """Vector stored under digest, or None"""
+        table = self._table(dimensions, create=False)
+        if table is None:
+            return None
+        for index in self._probe(table, digest):
+            slot = table[index]
+            if slot["checksum"] == 0:
+                return None
+            if slot["digest"].tobytes() == digest:
+                vector = np.array(slot["vector"], dtype=np.float32)
+                if self._checksum(digest, vector) == slot["checksum"]:
+                    return vector
+                return None
+        return None
+
+    def put(self, digest: bytes, vector: np.ndarray) -> None:
+        """Store a vector (overwrites its home slot when every probe position is taken)"""
+        vector = np.ascontiguousarray(vector, dtype=np.float32)
+        table = self._table(vector.shape[0], create=True)
+        target = None
+        for index in self._probe(table, digest):
+            slot = table[index]
+            if slot["checksum"] == 0 or slot["digest"].tobytes() == digest:
+                target = index
+                break
+        if target is None:
+            target = next(self._probe(table, digest))
+
+        # Invalidate first so readers never pair the new digest with a
+        # half-written vector
+        table["checksum"][target] = 0
+        table["vector"][target] = vector
+        table["digest"][target] = np.frombuffer(digest, dtype=np.uint8)
+        table["checksum"][target] = self._checksum(digest, vector)
+
+    def lookup(self, digest: bytes) -> Optional[np.ndarray]:
+        """Look a digest up in every dimension table present on disk"""
+        if not os.path.isdir(self.directory):
+            return None
+        for name in os.listdir(self.directory):
+            if name.startswith("embeddings-") and name.endswith(".bin"):
+                try:
+                    dimensions = int(name[len("embeddings-"):-len(".bin")])
+                except ValueError:
+                    continue
+                vector = self.get(digest, dimensions)
+                if vector is not None:
+                    return vector
+        return None
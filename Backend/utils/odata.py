@@ -0,0 +1,19 @@
+"""
+Helpers for building Azure AI Search OData filter expressions
+"""
+
+
+def quote(value: str) -> str:
+    """Quote a string literal for an OData filter (single quotes are doubled)"""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def eq(field: str, value: str) -> str:
+    """Filter expression matching `field` equal to `value`"""
+    return f"{field} eq {quote(value)}"
+
+
+def search_in(field: str, values) -> str:
+    """Filter expression matching `field` against any of `values` (search.in)"""
+    joined = ",".join(str(v) for v in values)
+    return f"search.in({field}, {quote(joined)}, ',')"
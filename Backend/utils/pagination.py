@@ -0,0 +1,29 @@
+"""
+Opaque cursors for keyset pagination
+"""
+import base64
+import json
+from typing import Tuple
+
+
+def encode_cursor(upload_date: str, document_id: str) -> str:
+    """Encode the sort key of the last returned document as an opaque cursor"""
+    raw = json.dumps([upload_date, document_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        upload_date, document_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(upload_date, str) or not isinstance(document_id, str):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return upload_date, document_id
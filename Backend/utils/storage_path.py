@@ -0,0 +1,45 @@
+"""
+Helpers for the base64-encoded `metadata_storage_path` used as search index key
+"""
+import base64
+from typing import Optional
+
+
+def encode_storage_path(path: str) -> str:
+    """
+    Encode a storage path as an index key, the same way the blob indexer's
+    base64Encode mapping does (URL-safe base64, padding replaced by its count)
+    """
+    encoded = base64.urlsafe_b64encode(path.encode("utf-8")).decode("ascii")
+    stripped = encoded.rstrip("=")
+    return f"{stripped}{len(encoded) - len(stripped)}"
+
+
+def decode_storage_path(encoded_path: str) -> str:
+    """
+    Decode a base64 `metadata_storage_path`
+
+    Handles plain and URL-safe base64 as well as the URL token format
+    produced by the blob indexer's base64Encode mapping, where a trailing
+    digit gives the number of stripped padding characters.
+    """
+    if not encoded_path:
+        return ""
+
+    last = encoded_path[-1]
+    if last in "012" and (len(encoded_path) - 1 + int(last)) % 4 == 0:
+        encoded_path = encoded_path[:-1] + "=" * int(last)
+    else:
+        encoded_path += "=" * (-len(encoded_path) % 4)
+
+    try:
+        return base64.urlsafe_b64decode(encoded_path).decode("utf-8", errors="ignore")
+    except Exception:
+        return ""
+
+
+def document_id_from_path(path: str) -> Optional[str]:
+    """Extract the document ID from a decoded path: .../documents/<document_id>/<filename>"""
+    if "/documents/" not in path:
+        return None
+    return path.split("/documents/")[1].split("/")[0] or None
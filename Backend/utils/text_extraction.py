@@ -0,0 +1,80 @@
+"""
+Text extraction and passage chunking
+
+These functions are CPU-bound and run in worker processes, so they only
+depend on the parsing libraries and take/return plain picklable values.
+"""
+import io
+from typing import List
+
+
+def extract_pages(file_content: bytes, file_ext: str) -> List[str]:
+    """
+    Extract text from a document
+
+    Args:
+        file_content: Raw file bytes
+        file_ext: File extension (e.g. ".pdf")
+
+    Returns:
+        List of page texts (a single entry for DOCX and images)
+    """
+    if file_ext == ".pdf":
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(io.BytesIO(file_content))
+        return [page.extract_text() or "" for page in reader.pages]
+
+    if file_ext == ".docx":
+        import docx
+
+        document = docx.Document(io.BytesIO(file_content))
+        return ["\n".join(p.text for p in document.paragraphs if p.text.strip())]
+
+    if file_ext in {".jpg", ".jpeg", ".png"}:
+        import pytesseract
+        from PIL import Image
+
+        return [pytesseract.image_to_string(Image.open(io.BytesIO(file_content)))]
+
+    raise ValueError(f"Unsupported file type for extraction: {file_ext}")
+
+
+def chunk_passages(pages: List[str], passage_size: int, overlap: int) -> List[dict]:
+    """
+    Split page texts into overlapping passages of roughly `passage_size` characters
+
+    Passages end on a word boundary where possible and never span pages.
+
+    Returns:
+        List of {"page": page_number, "text": passage_text}
+    """
+    passages = []
+    for page_number, page_text in enumerate(pages, 1):
+        text = " ".join(page_text.split())
+        start = 0
+        while start < len(text):
+            end = min(start + passage_size, len(text))
+            if end < len(text):
+                boundary = text.rfind(" ", start + passage_size // 2, end)
+                if boundary != -1:
+                    end = boundary
+
+            passages.append({"page": page_number, "text": text[start:end].strip()})
+
+            if end >= len(text):
+                break
+
+            # Start the next passage `overlap` characters back, on a word start
+            next_start = max(end - overlap, start + 1)
+            if text[next_start - 1] != " ":
+                boundary = text.find(" ", next_start, end)
+                if boundary != -1:
+                    next_start = boundary + 1
+            start = next_start
+    return passages
+
+
+def extract_passages(file_content: bytes, file_ext: str, passage_size: int, overlap: int) -> List[dict]:
+    """Extract text and split it into passages (entry point for worker processes)"""
+    return chunk_passages(extract_pages(file_content, file_ext), passage_size, overlap)
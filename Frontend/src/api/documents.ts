@@ -6,6 +6,8 @@ import type {
   DocumentListResponse,
   Document,
   AskResponse,
+  AskStreamHandlers,
+  DocumentStatusEvent,
 } from "../types";
 
 // Upload document
@@ -23,15 +25,41 @@ export async function uploadDocument(file: File): Promise<UploadResponse> {
   return response.data;
 }
 
-// List user's documents (filtered by session)
+// List user's documents (filtered by session), following next_cursor page by page
 export async function listMyDocuments(): Promise<DocumentListResponse> {
   const sessionId = getSessionId();
+  const documents: Document[] = [];
+  let cursor: string | null = null;
 
-  const response = await axios.get(`${API_URL}/api/v1/documents`, {
-    params: { session_id: sessionId },
-  });
+  do {
+    const response: { data: DocumentListResponse } = await axios.get(
+      `${API_URL}/api/v1/documents`,
+      { params: { session_id: sessionId, cursor: cursor ?? undefined } }
+    );
+    documents.push(...response.data.documents);
+    cursor = response.data.next_cursor ?? null;
+  } while (cursor);
 
-  return response.data;
+  return { documents, count: documents.length, next_cursor: null };
+}
+
+// Subscribe to status changes of the user's documents (server-sent events).
+// Returns a function that closes the stream.
+export function subscribeToDocumentStatus(
+  onEvent: (event: DocumentStatusEvent) => void
+): () => void {
+  const url = `${API_URL}/api/v1/documents/events?session_id=${encodeURIComponent(
+    getSessionId()
+  )}`;
+  const source = new EventSource(url);
+
+  const handle = (type: DocumentStatusEvent["type"]) => (e: MessageEvent) =>
+    onEvent({ type, documents: JSON.parse(e.data).documents });
+
+  source.addEventListener("snapshot", handle("snapshot"));
+  source.addEventListener("update", handle("update"));
+
+  return () => source.close();
 }
 
 // Get specific document
@@ -61,3 +89,36 @@ export async function askQuestion(
 
   return response.data;
 }
+
+// Ask question and receive the answer as it is generated (server-sent events).
+// Returns a function that closes the stream.
+export function streamQuestion(
+  documentId: string,
+  question: string,
+  handlers: AskStreamHandlers
+): () => void {
+  const params = new URLSearchParams({
+    question,
+    document_id: documentId,
+    session_id: getSessionId(),
+  });
+  const source = new EventSource(`${API_URL}/api/v1/ask/stream?${params}`);
+  const data = (e: Event) => JSON.parse((e as MessageEvent).data);
+
+  source.addEventListener("citations", (e) =>
+    handlers.onCitations?.(data(e).citations)
+  );
+  source.addEventListener("token", (e) => handlers.onToken(data(e).text));
+  source.addEventListener("done", (e) => {
+    source.close();
+    handlers.onDone?.(data(e));
+  });
+  // Fired both for server-sent "error" events and for connection failures
+  source.addEventListener("error", (e) => {
+    source.close();
+    const payload = (e as MessageEvent).data ? data(e) : null;
+    handlers.onError(payload?.message || payload?.error || "Connection lost");
+  });
+
+  return () => source.close();
+}
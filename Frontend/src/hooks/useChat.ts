@@ -1,6 +1,9 @@
 import { useState, useEffect } from "react";
-import { askQuestion as askQuestionApi } from "../api/documents";
-import type { Message, Document } from "../types";
+import {
+  askQuestion as askQuestionApi,
+  streamQuestion,
+} from "../api/documents";
+import type { Message, Document, Citation } from "../types";
 import { chatStorage } from "../services/chatStorage";
 
 export function useChat(document: Document | null) {
@@ -78,18 +81,47 @@ export function useChat(document: Document | null) {
     setMessages(updatedWithUser);
     setLoading(true);
 
-    try {
-      const response = await askQuestionApi(document.document_id, question);
+    const botMessage: Message = {
+      id: (Date.now() + 1).toString(),
+      type: "bot",
+      text: "",
+      timestamp: new Date(),
+    };
 
-      const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        type: "bot",
-        text: response.answer,
-        timestamp: new Date(),
-        citations: response.citations,
-      };
+    try {
+      // Stream the answer into the bot message as it is generated
+      const streamed = await new Promise<Message | null>((resolve) => {
+        let text = "";
+        let citations: Citation[] | undefined;
+        const render = () =>
+          setMessages([...updatedWithUser, { ...botMessage, text, citations }]);
+
+        streamQuestion(document.document_id, question, {
+          onCitations: (received) => {
+            citations = received;
+          },
+          onToken: (token) => {
+            text += token;
+            render();
+          },
+          onDone: () => resolve({ ...botMessage, text, citations }),
+          // Nothing shown yet: fall back to the regular endpoint
+          onError: (message) =>
+            resolve(text ? { ...botMessage, text: `${text}\n\n${message}`, citations } : null),
+        });
+      });
+
+      let finalBotMessage = streamed;
+      if (!finalBotMessage) {
+        const response = await askQuestionApi(document.document_id, question);
+        finalBotMessage = {
+          ...botMessage,
+          text: response.answer,
+          citations: response.citations,
+        };
+      }
 
-      const finalMessages = [...updatedWithUser, botMessage];
+      const finalMessages = [...updatedWithUser, finalBotMessage];
       setMessages(finalMessages);
       await saveChatHistory(finalMessages);
     } catch (error: any) {
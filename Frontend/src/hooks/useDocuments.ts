@@ -1,6 +1,6 @@
 import { useState, useEffect, useCallback, useRef } from "react";
-import { listMyDocuments } from "../api/documents";
-import type { Document } from "../types";
+import { listMyDocuments, subscribeToDocumentStatus } from "../api/documents";
+import type { Document, DocumentStatusEvent } from "../types";
 
 export function useDocuments() {
   const [documents, setDocuments] = useState<Document[]>([]);
@@ -53,18 +53,47 @@ export function useDocuments() {
     return false; // No meaningful changes
   };
 
+  // Apply pushed status changes; unknown documents trigger a full refresh
+  const applyStatusEvent = useCallback(
+    (event: DocumentStatusEvent) => {
+      const current = previousDocsRef.current;
+      const known = new Set(current.map((d) => d.document_id));
+
+      if (event.documents.some((d) => !known.has(d.document_id))) {
+        fetchDocuments(false);
+        return;
+      }
+
+      const changes = new Map(event.documents.map((d) => [d.document_id, d]));
+      const newDocs = current.map((doc) => {
+        const change = changes.get(doc.document_id);
+        return change
+          ? {
+              ...doc,
+              status: change.status,
+              processed: change.processed,
+              error_message: change.error_message,
+            }
+          : doc;
+      });
+
+      if (hasDocumentsChanged(current, newDocs)) {
+        setDocuments(newDocs);
+        previousDocsRef.current = newDocs;
+      }
+    },
+    [fetchDocuments]
+  );
+
   useEffect(() => {
     // Initial fetch with loading indicator
     fetchDocuments(true);
 
-    // Auto-refresh to check for status updates (without loading indicator)
-    // Only updates UI when status actually changes
-    const interval = setInterval(() => {
-      fetchDocuments(false); // Silent refresh
-    }, 10000); // Check every 10 seconds
+    // Status updates are pushed by the server instead of polled
+    const unsubscribe = subscribeToDocumentStatus(applyStatusEvent);
 
-    return () => clearInterval(interval);
-  }, [fetchDocuments]);
+    return unsubscribe;
+  }, [fetchDocuments, applyStatusEvent]);
 
   return {
     documents,
@@ -13,6 +13,19 @@ export interface Document {
   error_message?: string;
 }
 
+export interface DocumentStatus {
+  document_id: string;
+  filename: string;
+  status: string;
+  processed: boolean;
+  error_message?: string;
+}
+
+export interface DocumentStatusEvent {
+  type: "snapshot" | "update";
+  documents: DocumentStatus[];
+}
+
 export interface Citation {
   text: string;
   page_number?: number;
@@ -41,6 +54,7 @@ export interface UploadResponse {
 export interface DocumentListResponse {
   documents: Document[];
   count: number;
+  next_cursor?: string | null;
 }
 
 export interface AskResponse {
@@ -48,3 +62,20 @@ export interface AskResponse {
   citations?: Citation[];
   sources?: Citation[];
 }
+
+export interface AskStreamSummary {
+  usage: {
+    prompt_tokens: number;
+    completion_tokens: number;
+    total_tokens: number;
+    estimated?: boolean;
+  } | null;
+  timings: Record<string, number | null>;
+}
+
+export interface AskStreamHandlers {
+  onCitations?: (citations: Citation[]) => void;
+  onToken: (text: string) => void;
+  onDone?: (summary: AskStreamSummary) => void;
+  onError: (message: string) => void;
+}